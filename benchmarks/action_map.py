@@ -0,0 +1,110 @@
+"""
+Lookup benchmark for the action map with a few thousand rules.
+
+Compares a linear scan over all rules with the compiled table, with and without memoized results.
+
+Usage: python -m benchmarks.action_map
+"""
+import fnmatch
+import random
+import re
+import time
+
+from rpc_audit.action_map import ActionRule, MatchType, ActionTable
+
+TOPICS = ['compute', 'scheduler', 'conductor', 'network']
+ACTIONS = ['read', 'update', 'create', 'delete', 'start', 'stop', 'configure']
+
+
+def generate_rules(count: int):
+    rules = {topic: [] for topic in TOPICS}
+
+    for i in range(count):
+        topic = TOPICS[i % len(TOPICS)]
+        action = ACTIONS[i % len(ACTIONS)]
+        kind = i % 10
+
+        if kind < 7:
+            rule = ActionRule(MatchType.EXACT, 'method_{}'.format(i), action)
+        elif kind == 7:
+            rule = ActionRule(MatchType.PREFIX, 'prefix_{}_'.format(i), action)
+        elif kind == 8:
+            rule = ActionRule(MatchType.GLOB, 'get_{}_*_console'.format(i), action)
+        else:
+            rule = ActionRule(MatchType.REGEX, 'regex_{}_[a-z]+'.format(i), action)
+
+        rules[topic].append(rule)
+
+    return rules
+
+
+def generate_lookups(rules, count: int):
+    lookups = []
+
+    for topic, topic_rules in rules.items():
+        for rule in topic_rules:
+            if rule.match_type == MatchType.EXACT:
+                method = rule.pattern
+            elif rule.match_type == MatchType.PREFIX:
+                method = rule.pattern + 'instance'
+            elif rule.match_type == MatchType.GLOB:
+                method = rule.pattern.replace('*', 'vnc')
+            else:
+                method = rule.pattern.replace('[a-z]+', 'instance')
+
+            lookups.append((topic, method))
+
+        # Methods without matching rule
+        lookups += [(topic, 'unmapped_{}'.format(i)) for i in range(len(topic_rules) // 10)]
+
+    random.seed(0)
+    return [random.choice(lookups) for _ in range(count)]
+
+
+def linear_lookup(rules, topic, method):
+    for rule in rules.get(topic, []):
+        if rule.match_type == MatchType.EXACT:
+            if rule.pattern == method:
+                return rule.action
+        elif rule.match_type == MatchType.PREFIX:
+            if method.startswith(rule.pattern):
+                return rule.action
+        elif rule.match_type == MatchType.GLOB:
+            if fnmatch.fnmatchcase(method, rule.pattern):
+                return rule.action
+        elif re.fullmatch(rule.pattern, method):
+            return rule.action
+
+    return None
+
+
+def measure(name, func, lookups):
+    start = time.perf_counter()
+
+    for topic, method in lookups:
+        func(topic, method)
+
+    elapsed = time.perf_counter() - start
+    print("{:<24} {:>10.0f} ns/lookup".format(name, elapsed / len(lookups) * 1e9))
+
+
+def main(rule_count=4000, lookup_count=100000):
+    rules = generate_rules(rule_count)
+    lookups = generate_lookups(rules, lookup_count)
+
+    start = time.perf_counter()
+    table = ActionTable(rules)
+    print("Compiled {} rules in {:.1f} ms".format(rule_count, (time.perf_counter() - start) * 1000))
+
+    # Sanity check: both implementations return the same actions
+    for topic, method in lookups[:1000]:
+        assert table.resolve(topic, method) == linear_lookup(rules, topic, method), (topic, method)
+
+    measure("linear scan", lambda topic, method: linear_lookup(rules, topic, method), lookups[:lookup_count // 20])
+    measure("compiled", table.resolve, lookups)
+    measure("compiled + memoized", table.lookup, lookups)
+    measure("memoized (warm)", table.lookup, lookups)
+
+
+if __name__ == '__main__':
+    main()
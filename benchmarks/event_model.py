@@ -0,0 +1,145 @@
+"""
+Time and memory per event for the internal event model compared to building pycadf events directly.
+
+"pycadf" builds the event like the builders did before the internal model was introduced: every builder creates
+pycadf objects (with validation on every setter) and the pycadf event is created from the collected data. It calls
+the builder bodies directly, while "model" goes through `build_events` including the builder dispatch, so the
+comparison slightly favours pycadf.
+
+Memory is measured with tracemalloc as the number and size of the memory blocks retained per built event.
+
+Usage: python -m benchmarks.event_model
+"""
+import json
+import time
+import tracemalloc
+import warnings
+from hashlib import sha256
+from types import SimpleNamespace
+
+from pycadf import attachment, credential, event, host, resource
+from pycadf.cadftaxonomy import ACCOUNT_USER, OUTCOME_FAILURE, OUTCOME_SUCCESS, UNKNOWN
+from pycadf.cadftype import EVENTTYPE_ACTIVITY
+
+from rpc_audit.base import ObserverRole, prune_dict
+from rpc_audit.modules.oslo_messaging import action_map, builder
+
+CONTEXT = {
+    'ctxt': SimpleNamespace(
+        user='30992343-4236-4607-93e3-2f24fbba85ff', user_name='test-user', user_domain='default',
+        auth_token='73adeeaf0c6a4ec9264e19aae44014f2244ff416ed3de915d576f597fe313db5', remote_address='10.11.12.13',
+        project_domain='default', project_id='8b6e9330-16b4-4ee4-8154-e00b6ba51442', project_name='test-project',
+        is_admin=False, is_admin_project=False, roles=['reader', 'member'],
+        request_id='req-03a45f869c02d955453c4e1afb8f1b49',
+    ),
+    'target': SimpleNamespace(topic='compute'),
+}
+
+ARGS = {
+    'instance': {
+        'uuid': 'f120c8b6-9d37-476c-a80d-22b33478b079',
+        'hostname': 'hostname.test',
+        'node': 'test-host',
+    }
+}
+
+
+def build_pycadf_event(context, method, args, role, result=None):
+    """
+    Builds the event with pycadf objects, like the oslo.messaging and default builders before the internal model.
+    """
+
+    ctxt = context['ctxt']
+    topic = context['target'].topic
+
+    outcome = UNKNOWN if result is None else OUTCOME_SUCCESS if result else OUTCOME_FAILURE
+
+    cadf_credential = credential.Credential(ctxt.auth_token) if ctxt.auth_token else None
+    initiator = resource.Resource(ctxt.user, ACCOUNT_USER, ctxt.user_name, domain=ctxt.user_domain,
+                                  credential=cadf_credential, host=host.Host(address=ctxt.remote_address))
+
+    instance = args['instance']
+    target = resource.Resource(instance.get('uuid'), 'compute/machine', instance.get('hostname'),
+                               domain=ctxt.project_domain, host=host.Host(address=instance.get('node')))
+
+    observer = resource.Resource('topic/{}'.format(topic), 'service')
+
+    attachments = [
+        attachment.Attachment(name='project', typeURI='python/dict', content={
+            'id': ctxt.project_id, 'name': ctxt.project_name, 'domain': ctxt.project_domain}),
+        attachment.Attachment(name='permissions', typeURI='python/dict', content={
+            'is_admin': ctxt.is_admin, 'is_admin_project': ctxt.is_admin_project, 'roles': ctxt.roles}),
+        attachment.Attachment(name='request_id', typeURI='python/str', content=ctxt.request_id),
+        attachment.Attachment(typeURI='python/dict', name='rpc_method', content={
+            'method': method, 'role': role.name, 'args': prune_dict(args, builder.filter_args.get(method, {}))}),
+        attachment.Attachment(name='request_hash', typeURI='python/dict', content={
+            'algorithm': 'SHA256',
+            'hash': sha256('{}_{}'.format(method, json.dumps(args)).encode('utf-8')).hexdigest()}),
+    ]
+
+    cadf_event = event.Event(EVENTTYPE_ACTIVITY, action=action_map.lookup(topic, method) or UNKNOWN,
+                             outcome=outcome, initiator=initiator, target=target, observer=observer)
+
+    for item in attachments:
+        cadf_event.add_attachment(item)
+
+    for tag in ('oslo.messaging', 'rpc'):
+        cadf_event.add_tag(tag)
+
+    return cadf_event
+
+
+def build_model():
+    return [event.as_dict() for event in builder.build_events(CONTEXT, 'reboot_instance', ARGS, ObserverRole.SENDER)]
+
+
+def build_pycadf():
+    return [build_pycadf_event(CONTEXT, 'reboot_instance', ARGS, ObserverRole.SENDER).as_dict()]
+
+
+def build_events_only():
+    return builder.build_events(CONTEXT, 'reboot_instance', ARGS, ObserverRole.SENDER)
+
+
+def build_cadf_events_only():
+    return [build_pycadf_event(CONTEXT, 'reboot_instance', ARGS, ObserverRole.SENDER)]
+
+
+def measure_time(name, func, count):
+    start = time.perf_counter()
+
+    for _ in range(count):
+        func()
+
+    elapsed = time.perf_counter() - start
+    print("{:<32} {:>8.1f} us/event".format(name, elapsed / count * 1e6))
+
+
+def measure_memory(name, func, count):
+    tracemalloc.start()
+
+    events = [func() for _ in range(count)]
+    statistics = tracemalloc.take_snapshot().statistics('filename')
+
+    tracemalloc.stop()
+    del events
+
+    blocks = sum(stat.count for stat in statistics)
+    size = sum(stat.size for stat in statistics)
+
+    print("{:<32} {:>8.1f} blocks/event {:>8.0f} bytes/event retained".format(name, blocks / count, size / count))
+
+
+def main(count=5000):
+    # pycadf warns about every id that is not a UUID
+    warnings.simplefilter('ignore')
+
+    measure_time("model, build + as_dict", build_model, count)
+    measure_time("pycadf, build + as_dict", build_pycadf, count)
+
+    measure_memory("model events", build_events_only, count // 5)
+    measure_memory("pycadf events", build_cadf_events_only, count // 5)
+
+
+if __name__ == '__main__':
+    main()
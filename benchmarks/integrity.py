@@ -0,0 +1,79 @@
+"""
+Write path overhead of the integrity log.
+
+Compares the `IntegrityLog` for different batch sizes with appending the events through one open file handle,
+flushed after every event like `IntegrityLog.write`. Writing like `build_and_save_events` without integrity log
+(open and append per event) is shown for reference, but is not the baseline: it is dominated by opening the file.
+
+Usage: python -m benchmarks.integrity
+"""
+import json
+import os
+import tempfile
+import time
+
+from rpc_audit.integrity import IntegrityLog, verify_log
+
+EXAMPLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'rpc_audit', 'examples', 'reboot_instance.json')
+
+
+def write_reopen(path, lines):
+    for line in lines:
+        with open(path, 'a') as event_file:
+            event_file.write(line)
+            event_file.write('\n')
+
+
+def write_plain(path, lines):
+    with open(path, 'ab') as event_file:
+        for line in lines:
+            event_file.write(line.encode('utf-8') + b'\n')
+            event_file.flush()
+
+
+def write_integrity(path, lines, batch_size, key):
+    log = IntegrityLog(path, batch_size=batch_size, key=key)
+
+    for line in lines:
+        log.write(line)
+
+    log.close()
+
+
+def measure(name, func, count, baseline=None):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+
+    overhead = '' if baseline is None else '{:+.1f} %'.format((elapsed / baseline - 1) * 100)
+    print("{:<32} {:>10.0f} events/s {:>10}".format(name, count / elapsed, overhead))
+
+    return elapsed
+
+
+def main(count=20000):
+    with open(EXAMPLE) as example_file:
+        line = json.dumps(json.load(example_file))
+
+    lines = [line] * count
+
+    with tempfile.TemporaryDirectory() as directory:
+        def path(name):
+            return os.path.join(directory, name)
+
+        baseline = measure("plain file, one handle", lambda: write_plain(path('plain'), lines), count)
+        measure("plain file, open per event", lambda: write_reopen(path('reopen'), lines), count, baseline)
+
+        for batch_size in (64, 1024):
+            measure("integrity, batch {}".format(batch_size),
+                    lambda: write_integrity(path('batch{}'.format(batch_size)), lines, batch_size, None),
+                    count, baseline)
+
+        measure("integrity, batch 1024, HMAC", lambda: write_integrity(path('hmac'), lines, 1024, b'key'),
+                count, baseline)
+
+        measure("verify", lambda: verify_log(path('hmac'), key=b'key'), count)
+
+
+if __name__ == '__main__':
+    main()
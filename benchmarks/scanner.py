@@ -0,0 +1,103 @@
+"""
+Scanner benchmark against a naive json.loads loop.
+
+Generates an event file from the example event (one event per second) and searches it for the events of one
+initiator, one request id, all "delete" events and the events of a time range.
+
+Usage: python -m benchmarks.scanner [number of events]
+"""
+import gzip
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from rpc_audit.scanner import Query, scan
+
+EXAMPLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'rpc_audit', 'examples', 'reboot_instance.json')
+
+ACTIONS = ['read', 'update', 'start', 'stop', 'delete']
+
+START = datetime(2020, 11, 22, tzinfo=timezone.utc)
+
+
+def generate(path, count):
+    with open(EXAMPLE) as example_file:
+        example = json.load(example_file)
+
+    initiators = [str(uuid.uuid4()) for _ in range(1000)]
+    request_id = {'name': 'request_id', 'typeURI': 'python/str', 'content': None}
+    example['attachments'].append(request_id)
+
+    with open(path, 'w') as log_file:
+        for i in range(count):
+            example['id'] = str(uuid.uuid4())
+            example['eventTime'] = (START + timedelta(seconds=i)).strftime('%Y-%m-%dT%H:%M:%S.%f+0000')
+            example['action'] = ACTIONS[i % len(ACTIONS)]
+            example['initiator']['id'] = initiators[i % len(initiators)]
+            request_id['content'] = 'req-{}'.format(i)
+
+            log_file.write(json.dumps(example))
+            log_file.write('\n')
+
+    return initiators[0]
+
+
+def naive(path, query):
+    with open(path, 'rb') as log_file:
+        return [line.rstrip(b'\n') for line in log_file if query.matches(json.loads(line))]
+
+
+def measure(name, func, size):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+
+    print("  {:<28} {:>8.2f} s {:>8.0f} MB/s {:>8} matches".format(name, elapsed, size / elapsed / 1e6, len(result)))
+
+    return result
+
+
+def main(count=100000):
+    directory = tempfile.mkdtemp()
+
+    try:
+        path = os.path.join(directory, 'events.txt')
+        initiator = generate(path, count)
+
+        with open(path, 'rb') as source, gzip.open(path + '.gz', 'wb', compresslevel=1) as target:
+            shutil.copyfileobj(source, target)
+
+        size = os.path.getsize(path)
+        print("{} events, {:.0f} MB, {} CPUs".format(count, size / 1e6, os.cpu_count()))
+
+        queries = [
+            ("initiator", Query(initiator_id=initiator)),
+            ("request id", Query(request_id='req-{}'.format(count // 2))),
+            ("action delete", Query(action='delete')),
+            ("time range", Query(since=START + timedelta(seconds=count // 2),
+                                 until=START + timedelta(seconds=count // 2 + count // 100))),
+        ]
+
+        for name, query in queries:
+            print(name)
+
+            expected = measure("naive json.loads", lambda: naive(path, query), size)
+
+            for workers in sorted({1, os.cpu_count()}):
+                result = measure("scan, {} workers".format(workers), lambda: list(scan([path], query, workers)), size)
+                assert result == expected
+
+            result = measure("scan gzip, {} workers".format(os.cpu_count()),
+                             lambda: list(scan([path + '.gz'], query)), size)
+            assert result == expected
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,306 @@
+import fnmatch
+import json
+import os
+import re
+from collections import Counter
+from enum import Enum
+from threading import Lock
+from typing import Dict, List, Optional, Tuple, Iterable
+
+from .base import LOG
+
+
+# Rules of this topic are used for all topics.
+ANY_TOPIC = '*'
+
+
+class MatchType(Enum):
+    # The method must be equal to the pattern.
+    EXACT = 'exact'
+
+    # The method must start with the pattern.
+    PREFIX = 'prefix'
+
+    # The method must match the shell-style wildcard pattern, e.g. "get_*_console".
+    GLOB = 'glob'
+
+    # The method must fully match the regular expression.
+    REGEX = 'regex'
+
+
+class ActionRule:
+    """
+    A rule maps all methods matching a pattern to one CADF action.
+    """
+
+    match_type: MatchType = None
+    pattern: str = None
+    action: str = None
+
+    def __init__(self, match_type: MatchType, pattern: str, action: str):
+        self.match_type = match_type
+        self.pattern = pattern
+        self.action = action
+
+    def to_regex(self) -> str:
+        """
+        Returns a regular expression that fully matches the same methods as this rule.
+        """
+
+        if self.match_type == MatchType.EXACT:
+            return re.escape(self.pattern)
+        elif self.match_type == MatchType.PREFIX:
+            return re.escape(self.pattern) + '.*'
+        elif self.match_type == MatchType.GLOB:
+            return fnmatch.translate(self.pattern)
+        else:
+            return self.pattern
+
+    def __repr__(self):
+        return 'ActionRule({}, {!r}, {!r})'.format(self.match_type.value, self.pattern, self.action)
+
+
+def parse_rules(data: dict) -> Dict[str, List[ActionRule]]:
+    """
+    Parses the rules of an action map file.
+
+    The file contains a dictionary for every topic. The `exact` dictionary maps method names to actions, the `rules`
+    list contains pattern rules, that are checked in the given order:
+
+    ```
+    {
+        "compute": {
+            "exact": {"reboot_instance": "start"},
+            "rules": [{"glob": "get_*_console", "action": "read"}]
+        }
+    }
+    ```
+
+    :param data: The decoded content of the file.
+    :return: The rules for every topic.
+    """
+
+    rules = {}
+
+    for topic, topic_data in data.items():
+        topic_rules = [ActionRule(MatchType.EXACT, method, action)
+                       for method, action in topic_data.get('exact', {}).items()]
+
+        for rule in topic_data.get('rules', []):
+            match_types = [match_type for match_type in MatchType if match_type.value in rule]
+
+            if len(match_types) != 1 or 'action' not in rule:
+                raise ValueError("Invalid action rule for topic {}: {}".format(topic, rule))
+
+            topic_rules.append(ActionRule(match_types[0], rule[match_types[0].value], rule['action']))
+
+        rules[topic] = topic_rules
+
+    return rules
+
+
+class ActionTable:
+    """
+    Compiled, read-only form of a set of rules.
+
+    Exact rules are stored in one dictionary indexed by (topic, method). Consecutive prefix and glob rules of a topic
+    are compiled into one regular expression, where every rule is a named alternative, so one match finds the first
+    matching rule. Regex rules are compiled on their own, so their groups, references and flags keep their meaning.
+    The compiled patterns are checked in the order of the rules. Every resolved (topic, method) pair is memoized.
+    """
+
+    # Maximum number of memoized lookups, protects against unbounded growth with random method names.
+    max_cache_size = 65536
+
+    def __init__(self, rules: Dict[str, List[ActionRule]]):
+        self.exact: Dict[Tuple[str, str], str] = {}
+        self.patterns: Dict[str, List[Tuple[re.Pattern, List[str]]]] = {}
+        self.cache: Dict[Tuple[str, str], Optional[str]] = {}
+        self.topics = frozenset(topic for topic in rules if topic != ANY_TOPIC)
+
+        for topic, topic_rules in rules.items():
+            patterns = []
+            combined_rules = []
+
+            for rule in topic_rules:
+                if rule.match_type == MatchType.EXACT:
+                    # The first rule for a method wins, like for the pattern rules.
+                    self.exact.setdefault((topic, rule.pattern), rule.action)
+                elif rule.match_type == MatchType.REGEX:
+                    if combined_rules:
+                        patterns.append(self.compile(topic, combined_rules))
+                        combined_rules = []
+
+                    patterns.append(self.compile(topic, [rule]))
+                else:
+                    combined_rules.append(rule)
+
+            if combined_rules:
+                patterns.append(self.compile(topic, combined_rules))
+
+            if patterns:
+                self.patterns[topic] = patterns
+
+    @staticmethod
+    def compile(topic: str, rules: List[ActionRule]) -> Tuple[re.Pattern, List[str]]:
+        """
+        Compiles rules into one regular expression. A single rule is compiled unchanged, otherwise every rule is a
+        named alternative.
+        """
+
+        if len(rules) == 1:
+            regex = rules[0].to_regex()
+        else:
+            regex = '|'.join('(?P<r{}>(?:{}))'.format(i, rule.to_regex()) for i, rule in enumerate(rules))
+
+        try:
+            return re.compile(regex), [rule.action for rule in rules]
+        except re.error as e:
+            raise ValueError("Invalid pattern rule for topic {}: {}".format(topic, e))
+
+    def _match(self, topic: str, method: str) -> Optional[str]:
+        action = self.exact.get((topic, method))
+
+        if action is not None:
+            return action
+
+        for pattern, actions in self.patterns.get(topic, ()):
+            match = pattern.fullmatch(method)
+
+            if match is not None:
+                return actions[int(match.lastgroup[1:])] if len(actions) > 1 else actions[0]
+
+        return None
+
+    def resolve(self, topic: str, method: str) -> Optional[str]:
+        """
+        Looks up the action without using the memoized results.
+        Rules of the topic have priority over the rules for all topics.
+        """
+
+        action = self._match(topic, method)
+
+        if action is None:
+            action = self._match(ANY_TOPIC, method)
+
+        return action
+
+    def lookup(self, topic: str, method: str) -> Optional[str]:
+        """
+        Returns the action for the method, or None if no rule matches.
+        """
+
+        key = (topic, method)
+
+        try:
+            return self.cache[key]
+        except KeyError:
+            pass
+
+        action = self.resolve(topic, method)
+
+        if len(self.cache) < self.max_cache_size:
+            self.cache[key] = action
+
+        return action
+
+
+class ActionMap:
+    """
+    Maps RPC methods to CADF actions by using the rules in a JSON file.
+
+    The rules are compiled into an `ActionTable`. Reloading the file compiles a new table and replaces the
+    reference afterwards, so lookups are never blocked and always see either the old or the new rules.
+    """
+
+    # Maximum number of (topic, method) pairs in `unmapped`.
+    max_unmapped = ActionTable.max_cache_size
+
+    def __init__(self, path: Optional[str] = None, rules: Optional[Dict[str, List[ActionRule]]] = None):
+        """
+        :param path: The JSON file that contains the rules.
+        :param rules: Rules that are used if no path is given.
+        """
+
+        self.path = path
+        self.mtime = None
+        self.table = ActionTable(rules or {})
+
+        # Counts how often every (topic, method) pair had no matching rule. Like the memoized lookups, at most
+        # `max_unmapped` pairs are counted, lookups of further pairs are only counted in `unmapped_other`.
+        self.unmapped = Counter()
+        self.unmapped_other = 0
+        self.unmapped_lock = Lock()
+
+        if path is not None:
+            self.reload()
+
+    @property
+    def topics(self) -> Iterable[str]:
+        """
+        All topics that have rules, except the rules for all topics.
+        """
+        return self.table.topics
+
+    def load(self, rules: Dict[str, List[ActionRule]]):
+        """
+        Compiles the rules and replaces the current rules with them.
+        """
+
+        self.table = ActionTable(rules)
+
+    def reload(self):
+        """
+        Loads and compiles the rules from the file.
+        If the file is invalid, an exception is raised and the current rules are kept.
+        """
+
+        mtime = os.stat(self.path).st_mtime
+
+        with open(self.path) as rule_file:
+            rules = parse_rules(json.load(rule_file))
+
+        self.load(rules)
+        self.mtime = mtime
+
+        LOG.info("Loaded action map from %s", self.path)
+
+    def reload_if_changed(self) -> bool:
+        """
+        Reloads the rules, if the file has been modified since the last load.
+
+        :return: True, if the rules have been reloaded.
+        """
+
+        if self.path is None:
+            return False
+
+        try:
+            if os.stat(self.path).st_mtime == self.mtime:
+                return False
+
+            self.reload()
+        except (OSError, ValueError) as e:
+            LOG.error("Could not reload action map %s: %s", self.path, e)
+            return False
+
+        return True
+
+    def lookup(self, topic: str, method: str) -> Optional[str]:
+        """
+        Returns the action for the method, or None if no rule matches.
+        Lookups without matching rule are counted in `unmapped`.
+        """
+
+        action = self.table.lookup(topic, method)
+
+        if action is None:
+            key = (topic, method)
+
+            with self.unmapped_lock:
+                if key in self.unmapped or len(self.unmapped) < self.max_unmapped:
+                    self.unmapped[key] += 1
+                else:
+                    self.unmapped_other += 1
+
+        return action
@@ -1,15 +1,19 @@
 import json
 import logging
+import os
+import time
 from _thread import start_new_thread
 from enum import Enum
 from hashlib import sha256
 from typing import Dict, List, Optional, Any, Callable
 
-from pycadf.attachment import Attachment
 from pycadf.cadftype import EVENTTYPE_ACTIVITY
-from pycadf.event import EVENT_KEYNAMES, Event, EVENT_KEYNAME_EVENTTYPE, EVENT_KEYNAME_TAGS, EVENT_KEYNAME_ATTACHMENTS
+from pycadf.event import EVENT_KEYNAMES, EVENT_KEYNAME_EVENTTYPE, EVENT_KEYNAME_TAGS, EVENT_KEYNAME_ATTACHMENTS
 from pycadf.identifier import generate_uuid
 
+from .bus import EventBus
+from .model import Attachment, Event, validate_events
+
 # Create logger
 LOG = logging.getLogger('rpc_audit')
 fh = logging.FileHandler('/tmp/rpc-audit.log')
@@ -24,6 +28,16 @@ LOG.info("Running RPC Audit")
 
 USE_API = True
 
+# File, where the events are stored (one JSON object per line)
+EVENT_FILE = '/tmp/rpc_events.txt'
+
+# Open integrity logs (`rpc_audit.integrity.IntegrityLog`) of this process, indexed by the absolute path of their event
+# file. Environments without own log use the log of `EVENT_FILE`, so there is only one writer per file.
+INTEGRITY_LOGS: Dict[str, Any] = {}
+
+# Tag that is added to events, that have been built with the essential builders only.
+DEGRADED_TAG = 'degraded'
+
 
 class ObserverRole(Enum):
     SENDER = 1
@@ -38,6 +52,15 @@ class BuilderType(Enum):
     APPEND = 2
 
 
+class BuilderPriority(Enum):
+    # The builder is always executed. Used for the core attributes (action, initiator, target, outcome, ...).
+    ESSENTIAL = 1
+
+    # The builder is skipped, if the environment only builds essential data because it is overloaded.
+    # Used for additional information (permissions, results, ...).
+    ENRICHMENT = 2
+
+
 class Builder:
     """
     A Builder object is responsible for returning the data for one attribute.
@@ -47,9 +70,13 @@ class Builder:
     builder_type: BuilderType = None
     func = None
 
-    def __init__(self, builder_type: BuilderType, func):
+    # Specifies if the builder is executed, if only the essential event data is built.
+    priority: BuilderPriority = None
+
+    def __init__(self, builder_type: BuilderType, func, priority: BuilderPriority = BuilderPriority.ESSENTIAL):
         self.builder_type = builder_type
         self.func = func
+        self.priority = priority
 
     def __call__(self, *args, **kwargs):
         return self.func(*args, **kwargs)
@@ -93,51 +120,30 @@ def prune_dict(dct, mask):
     return result
 
 
-def build_event_from_data(event_data: dict) -> Optional[Event]:
+def get_topic(context: Any) -> Optional[str]:
     """
-    Builds a CADF Event Object.
-
-    Some list attributes (attachments, tags, measurements, reportersteps) cannot be set in the Event constructor.
-    Therefore, these attributes must be extracted and given into the according methods.
-
-    :param event_data: Dictionary with all required attributes.
-    :return: Generated event
+    Returns the topic of the RPC target in the context, or None if the context has no target.
     """
 
-    event_data_raw = event_data
+    target = context.get('target') if isinstance(context, dict) else None
 
-    try:
-        # Extract some attributes, because the have extra methods and cannot be used in the Event constructor
-        attachments = event_data.get('attachments', [])
-        tags = event_data.get('tags', [])
-        measurements = event_data.get('measurements', [])
-        reportersteps = event_data.get('reportersteps', [])
-
-        event_data.pop('attachments', None)
-        event_data.pop('tags', None)
-        event_data.pop('measurements', None)
-        event_data.pop('reportersteps', None)
+    return getattr(target, 'topic', None)
 
-        # Build event
-        event = Event(**event_data)
 
-        # Add extracted attributes
-        for attachment in attachments:
-            LOG.debug("ATTACHMENT: %s", attachment.as_dict())
-            event.add_attachment(attachment)
-
-        for tag in tags:
-            event.add_tag(tag)
+def build_event_from_data(event_data: dict) -> Optional[Event]:
+    """
+    Builds an Event Object.
 
-        for measurement in measurements:
-            event.add_measurement(measurement)
+    The event is not validated, this can be done with `validate_events` or by converting it into a pycadf event.
 
-        for reporterstep in reportersteps:
-            event.add_reporterstep(reporterstep)
+    :param event_data: Dictionary with all required attributes.
+    :return: Generated event
+    """
 
-        return event
-    except ValueError as e:
-        LOG.error(f"Could not create event: {e} | Data: %s", event_data_raw, exc_info=True)
+    try:
+        return Event(**event_data)
+    except (TypeError, ValueError) as e:
+        LOG.error(f"Could not create event: {e} | Data: %s", event_data, exc_info=True)
         return None
 
 
@@ -147,8 +153,6 @@ def send_to_audit_api(event: Event, role: ObserverRole):
     """
 
     if USE_API:
-        from oslo_messaging.notify._impl_https import HttpsDriver
-
         project_id = None
 
         for att in event.attachments:
@@ -165,6 +169,8 @@ def send_to_audit_api(event: Event, role: ObserverRole):
         }
 
         try:
+            from oslo_messaging.notify._impl_https import HttpsDriver
+
             api_client = HttpsDriver(None, None, None)
             api_client.notify(None, data, "None", 1)
         except Exception as e:
@@ -179,18 +185,36 @@ class CADFBuildingEnv:
     that are used to generate the application specific CADF attributes.
     """
 
-    # This map contains all registered builders.
-    builder_map: Dict[str, List[Builder]] = {}
+    # This map contains all registered builders. Every instance has its own map.
+    builder_map: Dict[str, List[Builder]] = None
 
     # This map filters, which RPC method parameters should be added to the event
     filter_args: Optional[Dict[str, Dict]] = None
 
-    # Optional callback that is called for each generated event
-    callback: Optional[Callable] = None
+    # Subscribers of the generated events. Every instance has its own bus.
+    bus: EventBus = None
+
+    # Optional recorder (`rpc_audit.recorder.TraceRecorder`) that writes a snapshot of every RPC call to a trace file
+    recorder = None
+
+    # Optional controller (`rpc_audit.degradation.DegradationController`) that decides, if only the essential event
+    # data is built because the environment is overloaded
+    degradation = None
+
+    # Optional log (`rpc_audit.integrity.IntegrityLog`) that writes the events to the event file and seals them
+    integrity = None
+
+    # Validate the events against the CADF model before saving them. Invalid events are discarded.
+    validate: bool = False
 
     def __init__(self):
         LOG.debug("BuilderEnv Init")
 
+        self.builder_map = {}
+        self.bus = EventBus()
+        self._callback = None
+        self._callback_subscription = None
+
         def build_event_type(*args, **kwargs):
             """
             Default builder to set the event type. Always returns "activity".
@@ -203,11 +227,21 @@ class CADFBuildingEnv:
             """
             return ['rpc']
 
+        def build_result_attachment(context, method, args, role, result=None):
+            """
+            Default builder for the result attachment. Adds the result after the method has been executed.
+            """
+
+            if result:
+                return [Attachment(typeURI="any", content=result, name="result")]
+
+            return []
+
         def build_attachments(context, method, args, role, result=None):
             """
             Default builder for attachments. Add the following attachments:
             - The called RPC method and parameters.
-            - The result after the method has been executed.
+            - A hash of the method and parameters.
             """
 
             args_raw = context.get("args_raw")
@@ -228,25 +262,45 @@ class CADFBuildingEnv:
                                'hash': str(sha256('{}_{}'.format(method, hash_args_json).encode('utf-8')).hexdigest())
                            })]
 
-            if result:
-                attachments.append(Attachment(typeURI="any",
-                                              content=result,
-                                              name="result"))
-
             return attachments
 
-        # Register the above defined builders
+        # Register the above defined builders.
+        # Appended lists are prepended to the existing data, so the result attachment is registered first
+        # to be the last attachment.
         self.register_builder(EVENT_KEYNAME_EVENTTYPE, BuilderType.REPLACE, build_event_type)
         self.register_builder(EVENT_KEYNAME_TAGS, BuilderType.REPLACE, build_tags)
+        self.register_builder(EVENT_KEYNAME_ATTACHMENTS, BuilderType.APPEND, build_result_attachment,
+                              BuilderPriority.ENRICHMENT)
         self.register_builder(EVENT_KEYNAME_ATTACHMENTS, BuilderType.APPEND, build_attachments)
 
-    def register_builder(self, attr: str, builder_type: BuilderType, func: Callable):
+    @property
+    def callback(self) -> Optional[Callable]:
+        """
+        Optional callback that is called with the data (dict) of each saved event.
+        Called by a separate thread, use `bus.subscribe` for more options.
+        """
+        return self._callback
+
+    @callback.setter
+    def callback(self, callback: Optional[Callable]):
+        if self._callback_subscription is not None:
+            self.bus.unsubscribe(self._callback_subscription)
+            self._callback_subscription = None
+
+        self._callback = callback
+
+        if callback is not None:
+            self._callback_subscription = self.bus.subscribe(lambda envelope: callback(envelope.as_dict()))
+
+    def register_builder(self, attr: str, builder_type: BuilderType, func: Callable,
+                         priority: BuilderPriority = BuilderPriority.ESSENTIAL):
         """
         Registeres a given builder for an attribute.
 
         :param attr: The attribute that the builder returns.
         :param builder_type: The type of the builder.
         :param func: The function that should be executed.
+        :param priority: The priority of the builder, enrichment builders are skipped if the environment is degraded.
         """
         LOG.debug("Registered builder: %s", attr)
 
@@ -256,20 +310,20 @@ class CADFBuildingEnv:
         if attr not in self.builder_map:
             self.builder_map[attr] = []
 
-        self.builder_map[attr].append(Builder(builder_type, func))
+        self.builder_map[attr].append(Builder(builder_type, func, priority))
 
-    def builder(self, attr: str, builder_type: BuilderType):
+    def builder(self, attr: str, builder_type: BuilderType, priority: BuilderPriority = BuilderPriority.ESSENTIAL):
         """
         Decorator for the `register_builder` method.
         """
 
         def decorator(f):
-            self.register_builder(attr, builder_type, f)
+            self.register_builder(attr, builder_type, f, priority)
 
         return decorator
 
     def build_events(self, context: Any, method: str, args: Optional[Dict[str, Any]], role: ObserverRole,
-                     result: Any = None) -> List[Event]:
+                     result: Any = None, essential_only: bool = False) -> List[Event]:
         """
         Executes all builders and aggregates the data into Event objects.
 
@@ -281,18 +335,22 @@ class CADFBuildingEnv:
         :param args: The parameters for the called method
         :param role: The role of the observing service (client/server)
         :param result: The returned result after executing the method
+        :param essential_only: Only execute the essential builders and tag the events as degraded
         :return:
         """
 
-        LOG.debug("Building events, map: %s", self.builder_map)
-        LOG.debug("Building events, method: %s %s", method, args)
-        LOG.debug("Building events, result: %s", result)
+        debug = LOG.isEnabledFor(logging.DEBUG)
 
-        for key, value in context.items():
-            if callable(getattr(value, "as_dict", None)):
-                value = value.as_dict()
+        if debug:
+            LOG.debug("Building events, map: %s", self.builder_map)
+            LOG.debug("Building events, method: %s %s", method, args)
+            LOG.debug("Building events, result: %s", result)
 
-            LOG.debug("Building events, context[%s]: %s", key, value)
+            for key, value in context.items():
+                if callable(getattr(value, "as_dict", None)):
+                    value = value.as_dict()
+
+                LOG.debug("Building events, context[%s]: %s", key, value)
 
         events = []
         event_data = {}
@@ -301,11 +359,15 @@ class CADFBuildingEnv:
         for attr, builders in self.builder_map.items():
             # Iterate above all builders for that attribute.
             for builder in builders:
+                if essential_only and builder.priority != BuilderPriority.ESSENTIAL:
+                    continue
+
                 # Execute the builder
                 data = builder(context, method, args, role, result)
 
-                debug_data = data.as_dict() if getattr(data, "as_dict", None) else data
-                LOG.debug("Executed builder %s, mode: %s, result: %s", attr, builder.builder_type, debug_data)
+                if debug:
+                    debug_data = data.as_dict() if getattr(data, "as_dict", None) else data
+                    LOG.debug("Executed builder %s, mode: %s, result: %s", attr, builder.builder_type, debug_data)
 
                 # Replace the content if no content exists yet, or the BuilderType is "REPLACE"
                 if attr not in event_data or builder.builder_type == BuilderType.REPLACE:
@@ -318,29 +380,27 @@ class CADFBuildingEnv:
                         # Merge the content, new data has priority
                         event_data[attr] = merge(data, event_data[attr])
 
+        if essential_only:
+            # Allow consumers to recognize events with reduced data
+            event_data[EVENT_KEYNAME_TAGS] = list(event_data.get(EVENT_KEYNAME_TAGS) or []) + [DEGRADED_TAG]
+
         LOG.debug("Event data: %s", event_data)
 
-        if type(event_data['target']) == list:
+        if type(event_data.get('target')) == list:
             # Create multiple events if multiple targets exist
             targets = iter(event_data['target'])
 
-            first_target = next(targets)
-            event_data['target'] = first_target
-            events.append(build_event_from_data(event_data))
-
-            if event_data.get('tags') is None:
-                event_data['tags'] = []
-
-            # Add tag to allow grouping of all generated events
-            event_data['tags'].append(event_data['id'])
+            event_data['target'] = next(targets)
+            first_event = build_event_from_data(event_data)
+            events.append(first_event)
 
-            for target in targets:
-                new_data = event_data
+            if first_event is not None:
+                # Add tag to allow grouping of all generated events
+                first_event.tags = list(first_event.tags) + [first_event.id]
 
-                new_data['id'] = generate_uuid()
-                new_data['target'] = target
-
-                events.append(build_event_from_data(new_data))
+                # The other events share all attributes except the id and target with the first event
+                for target in targets:
+                    events.append(first_event.copy(id=generate_uuid(), target=target))
         else:
             # Just build one event
             events.append(build_event_from_data(event_data))
@@ -354,12 +414,19 @@ class CADFBuildingEnv:
         Will catch all errors and log them.
         """
         try:
-            events = self.build_events(context, method, args, role, result)
+            degradation = self.degradation
 
-            for event in events:
-                if self.callback:
-                    self.callback(event.as_dict())
+            if degradation is None:
+                events = self.build_events(context, method, args, role, result)
+            else:
+                start = time.perf_counter()
+                events = self.build_events(context, method, args, role, result, essential_only=degradation.degraded)
+                degradation.add_latency(time.perf_counter() - start)
+
+            if self.validate:
+                events = validate_events([event for event in events if event is not None])
 
+            for event in events:
                 if event is None:
                     LOG.warning("Discarded one invalid RPC-Audit event!")
                 else:
@@ -367,9 +434,21 @@ class CADFBuildingEnv:
 
                     send_to_audit_api(event, role)
 
-                    with open("/tmp/rpc_events.txt", "a") as event_file:
-                        event_file.write(json.dumps(event.as_dict()))
-                        event_file.write('\n')
+                    line = json.dumps(event.as_dict())
+
+                    integrity = self.integrity
+
+                    if integrity is None and INTEGRITY_LOGS:
+                        integrity = INTEGRITY_LOGS.get(os.path.abspath(EVENT_FILE))
+
+                    if integrity is not None:
+                        integrity.write(line)
+                    else:
+                        with open(EVENT_FILE, "a") as event_file:
+                            event_file.write(line)
+                            event_file.write('\n')
+
+                    self.bus.publish(event, role, get_topic(context), line)
         except Exception as e:
             LOG.error(e, exc_info=True)
 
@@ -380,7 +459,33 @@ class CADFBuildingEnv:
         Starts the event generation in a new thread.
         """
 
-        start_new_thread(self.build_and_save_events, (context, method, args, role, result))
+        if self.recorder is not None:
+            # The snapshot must be taken before the call returns, because the context may change afterwards.
+            self.recorder.record(context, method, args, role, result)
+
+        degradation = self.degradation
+
+        if degradation is None:
+            start_new_thread(self.build_and_save_events, (context, method, args, role, result))
+        else:
+            # Count the call as queued, until its events have been saved
+            degradation.enqueue()
+
+            try:
+                start_new_thread(self.build_and_save_events_queued, (degradation, context, method, args, role, result))
+            except Exception:
+                degradation.dequeue()
+                raise
+
+    def build_and_save_events_queued(self, degradation, context, method, args, role: ObserverRole, result=None):
+        """
+        Generates and saves the events and removes the call from the queue of the degradation controller afterwards.
+        """
+
+        try:
+            self.build_and_save_events(context, method, args, role, result)
+        finally:
+            degradation.dequeue()
 
     def rpc_received(self, context, method: str, args: Optional[Dict], result=None):
         """
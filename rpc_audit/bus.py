@@ -0,0 +1,315 @@
+import errno
+import json
+import logging
+import os
+import socket
+import socketserver
+import stat
+import threading
+from collections import deque, namedtuple
+from enum import Enum
+from typing import Any, Callable, Iterable, Optional
+
+LOG = logging.getLogger('rpc_audit')
+
+# Default socket for the live tail
+TAIL_SOCKET = '/tmp/rpc-audit-tail.sock'
+
+
+class DropPolicy(Enum):
+    # If the buffer is full, the oldest event is removed.
+    DROP_OLDEST = 1
+
+    # If the buffer is full, the new event is discarded.
+    DROP_NEWEST = 2
+
+
+class Envelope(namedtuple('Envelope', ['id', 'action', 'role', 'topic', 'line'])):
+    """
+    An event as it is delivered to the subscribers.
+
+    The same envelope is delivered to every subscriber, so it only contains immutable values: the id and action of
+    the event, the role and topic of the RPC call and the serialized event (JSON) in `line`. `as_dict` returns a new
+    copy of the event data, that may be modified.
+    """
+
+    __slots__ = ()
+
+    def as_dict(self) -> dict:
+        return json.loads(self.line)
+
+
+class Subscription:
+    """
+    A subscriber of an `EventBus`.
+
+    Every subscription has its own bounded buffer. Events are either delivered to the callback by a separate thread,
+    or fetched with `get`, if no callback is given. Slow subscribers only lose their own events and never block
+    the publisher or other subscribers.
+    """
+
+    def __init__(self, callback: Optional[Callable[[Envelope], Any]] = None, maxsize: int = 1024,
+                 drop_policy: DropPolicy = DropPolicy.DROP_OLDEST, actions: Optional[Iterable[str]] = None,
+                 topics: Optional[Iterable[str]] = None, roles: Optional[Iterable[Any]] = None):
+        """
+        :param callback: Function that is called with every envelope. If None, the events must be fetched with `get`.
+        :param maxsize: Size of the buffer.
+        :param drop_policy: Specifies which event is discarded, if the buffer is full.
+        :param actions: Only deliver events with one of these actions.
+        :param topics: Only deliver events of RPC calls with one of these topics.
+        :param roles: Only deliver events with one of these roles (`ObserverRole` or its name).
+        """
+
+        self.callback = callback
+        self.maxsize = maxsize
+        self.drop_policy = drop_policy
+
+        self.actions = frozenset(actions) if actions is not None else None
+        self.topics = frozenset(topics) if topics is not None else None
+        self.roles = frozenset(getattr(role, 'name', role) for role in roles) if roles is not None else None
+
+        self.buffer = deque(maxlen=maxsize if drop_policy == DropPolicy.DROP_OLDEST else None)
+        self.condition = threading.Condition()
+        self.closed = False
+
+        # Statistics
+        self.delivered = 0
+        self.dropped = 0
+
+        if callback is not None:
+            threading.Thread(target=self._deliver, name='rpc-audit-subscriber', daemon=True).start()
+
+    def matches(self, action: str, role, topic: Optional[str]) -> bool:
+        return (self.actions is None or action in self.actions) \
+            and (self.topics is None or topic in self.topics) \
+            and (self.roles is None or role.name in self.roles)
+
+    def offer(self, envelope: Envelope):
+        """
+        Adds an envelope to the buffer, never blocks.
+        """
+
+        with self.condition:
+            if len(self.buffer) >= self.maxsize:
+                self.dropped += 1
+
+                if self.drop_policy == DropPolicy.DROP_NEWEST:
+                    return
+
+            self.buffer.append(envelope)
+            self.condition.notify()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Envelope]:
+        """
+        Returns the next envelope, or None if no envelope has been published within the timeout.
+        """
+
+        with self.condition:
+            if not self.buffer and not self.closed:
+                self.condition.wait(timeout)
+
+            if not self.buffer:
+                return None
+
+            self.delivered += 1
+
+            return self.buffer.popleft()
+
+    def _deliver(self):
+        while not self.closed:
+            envelope = self.get(timeout=1.0)
+
+            if envelope is None:
+                continue
+
+            try:
+                self.callback(envelope)
+            except Exception as e:
+                LOG.error("Event subscriber failed: %s", e, exc_info=True)
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+
+class EventBus:
+    """
+    Delivers the saved events of an environment to any number of subscribers.
+
+    Publishing only adds the event to the buffers of the matching subscribers and returns immediately.
+    """
+
+    def __init__(self):
+        # Replaced on every change, so publishing can iterate over it without lock
+        self.subscriptions = ()
+        self.lock = threading.Lock()
+
+    def subscribe(self, callback: Optional[Callable[[Envelope], Any]] = None, **kwargs) -> Subscription:
+        """
+        Adds a subscriber. See `Subscription` for the parameters.
+        """
+
+        subscription = Subscription(callback, **kwargs)
+
+        with self.lock:
+            self.subscriptions = self.subscriptions + (subscription,)
+
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self.lock:
+            self.subscriptions = tuple(s for s in self.subscriptions if s is not subscription)
+
+        subscription.close()
+
+    def publish(self, event, role, topic: Optional[str], line: str):
+        """
+        Delivers an event to all matching subscribers.
+
+        :param event: The event, only its id and action are delivered.
+        :param role: The role of the observing service.
+        :param topic: The topic of the RPC call.
+        :param line: The serialized event.
+        """
+
+        envelope = None
+
+        for subscription in self.subscriptions:
+            if subscription.matches(event.action, role, topic):
+                if envelope is None:
+                    envelope = Envelope(event.id, event.action, role, topic, line)
+
+                subscription.offer(envelope)
+
+
+class TailHandler(socketserver.StreamRequestHandler):
+    """
+    Streams the events to one tail client.
+
+    The client sends one line with the filter (JSON object with the optional lists "actions", "topics", "roles")
+    and receives the matching events afterwards, one JSON object per line.
+
+    A disconnected client is detected when writing fails, or at the latest after one second without events.
+    """
+
+    def disconnected(self) -> bool:
+        """
+        Returns True, if the client has closed the connection. Other data sent by the client is discarded.
+        """
+
+        # A non-blocking receive works for every file descriptor, unlike select with descriptors >= FD_SETSIZE
+        try:
+            return not self.connection.recv(4096, socket.MSG_DONTWAIT)
+        except BlockingIOError:
+            return False
+
+    def handle(self):
+        line = self.rfile.readline()
+
+        if not line:
+            # The client disconnected without sending a filter, e.g. a check if the socket is used
+            return
+
+        filters = json.loads(line)
+        subscription = self.server.bus.subscribe(maxsize=self.server.maxsize, actions=filters.get('actions'),
+                                                 topics=filters.get('topics'), roles=filters.get('roles'))
+
+        try:
+            while not self.server.stopped:
+                envelope = subscription.get(timeout=1.0)
+
+                if envelope is not None:
+                    self.wfile.write(envelope.line.encode('utf-8') + b'\n')
+                    self.wfile.flush()
+                elif self.disconnected():
+                    break
+        except OSError:
+            # The client disconnected
+            pass
+        finally:
+            self.server.bus.unsubscribe(subscription)
+
+
+def remove_stale_socket(path: str):
+    """
+    Removes the socket of a terminated process. Raises an OSError, if the path is not a socket or the socket is
+    still used by a running process.
+    """
+
+    if not stat.S_ISSOCK(os.stat(path).st_mode):
+        raise OSError(errno.EEXIST, "Not a socket", path)
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(path)
+        except ConnectionRefusedError:
+            os.unlink(path)
+            return
+
+    raise OSError(errno.EADDRINUSE, "Socket is used by another process", path)
+
+
+class TailServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    stopped = False
+
+    def __init__(self, bus: EventBus, path: str, maxsize: int):
+        self.bus = bus
+        self.maxsize = maxsize
+
+        if os.path.exists(path):
+            remove_stale_socket(path)
+
+        super().__init__(path, TailHandler)
+
+    def stop(self):
+        self.stopped = True
+        self.shutdown()
+        self.server_close()
+
+
+def serve_tail(bus: EventBus, path: str = TAIL_SOCKET, maxsize: int = 1024) -> TailServer:
+    """
+    Allows to follow the events of a running process with `rpc_audit tail`.
+
+    Starts a server on a unix socket in a separate thread. Every connected client gets its own subscription.
+    Every process needs its own socket, the socket of a running process is never replaced.
+
+    :param bus: The bus of the environment, e.g. `building_env.bus`.
+    :param path: Path of the unix socket.
+    :param maxsize: Buffer size for every client, the oldest events are dropped if a client is too slow.
+    :return: The server, can be stopped with `stop()`.
+    """
+
+    server = TailServer(bus, path, maxsize)
+    threading.Thread(target=server.serve_forever, name='rpc-audit-tail', daemon=True).start()
+
+    return server
+
+
+def run_tail(args):
+    filters = {key: value for key, value in (('actions', args.action), ('topics', args.topic), ('roles', args.role))
+               if value}
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(args.socket)
+        client.sendall(json.dumps(filters).encode('utf-8') + b'\n')
+
+        try:
+            for line in client.makefile('r'):
+                print(line, end='', flush=True)
+        except KeyboardInterrupt:
+            pass
+
+    return 0
+
+
+def add_parser(subparsers):
+    parser = subparsers.add_parser('tail', help="Follow the events of a running process")
+    parser.add_argument('--socket', default=TAIL_SOCKET, help="Socket of the tail server (default: %(default)s)")
+    parser.add_argument('--action', action='append', help="Only show events with this action (repeatable)")
+    parser.add_argument('--topic', action='append', help="Only show events with this topic (repeatable)")
+    parser.add_argument('--role', action='append', choices=['SENDER', 'RECEIVER'],
+                        help="Only show events with this role (repeatable)")
+    parser.set_defaults(func=run_tail)
@@ -0,0 +1,26 @@
+import argparse
+import sys
+
+from . import replay, integrity, bus, scanner
+
+
+def main(argv=None):
+    """
+    Entry point of the `rpc_audit` command line tool.
+    """
+
+    parser = argparse.ArgumentParser(prog='rpc_audit', description="RPC Audit tools")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    replay.add_parser(subparsers)
+    integrity.add_parser(subparsers)
+    bus.add_parser(subparsers)
+    scanner.add_parser(subparsers)
+
+    args = parser.parse_args(argv)
+
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
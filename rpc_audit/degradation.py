@@ -0,0 +1,92 @@
+import time
+from threading import Lock
+from typing import Optional
+
+from .base import LOG
+
+
+class DegradationController:
+    """
+    Decides, if an environment only builds the essential event data because it is overloaded.
+
+    The environment switches to the degraded mode, as soon as the number of queued RPC calls or the (smoothed) build
+    latency reaches its maximum. It switches back, when both values are below their resume thresholds again and the
+    degraded mode has been active for at least `hold_time` seconds. The gap between the thresholds prevents
+    switching back and forth with every event.
+
+    To use the controller, set `CADFBuildingEnv.degradation` to an instance.
+    """
+
+    def __init__(self, max_queue_depth: int = 64, max_latency: float = 0.05,
+                 resume_queue_depth: Optional[int] = None, resume_latency: Optional[float] = None,
+                 hold_time: float = 5.0, smoothing: float = 0.1):
+        """
+        :param max_queue_depth: Number of queued calls, that activates the degraded mode.
+        :param max_latency: Build latency in seconds, that activates the degraded mode.
+        :param resume_queue_depth: Number of queued calls, below which the degraded mode ends.
+                                   Default: half of `max_queue_depth`.
+        :param resume_latency: Build latency in seconds, below which the degraded mode ends.
+                               Default: half of `max_latency`.
+        :param hold_time: Minimum time in seconds, the degraded mode stays active.
+        :param smoothing: Weight of a new latency value in the moving average.
+        """
+
+        self.max_queue_depth = max_queue_depth
+        self.max_latency = max_latency
+        self.resume_queue_depth = max_queue_depth // 2 if resume_queue_depth is None else resume_queue_depth
+        self.resume_latency = max_latency / 2 if resume_latency is None else resume_latency
+        self.hold_time = hold_time
+        self.smoothing = smoothing
+
+        self.queue_depth = 0
+        self.latency = 0.0
+        self.degraded = False
+        self.degraded_since = None
+
+        # Number of times the degraded mode has been activated
+        self.activations = 0
+
+        self.lock = Lock()
+
+    def enqueue(self):
+        """
+        Should be called when a call has been queued for processing.
+        """
+
+        with self.lock:
+            self.queue_depth += 1
+            self._update()
+
+    def dequeue(self):
+        """
+        Should be called when a queued call has been processed.
+        """
+
+        with self.lock:
+            self.queue_depth -= 1
+            self._update()
+
+    def add_latency(self, latency: float):
+        """
+        Adds the time in seconds, that was needed to build the events of one call.
+        """
+
+        with self.lock:
+            self.latency += self.smoothing * (latency - self.latency)
+            self._update()
+
+    def _update(self):
+        if self.degraded:
+            if self.queue_depth <= self.resume_queue_depth and self.latency <= self.resume_latency \
+                    and time.monotonic() - self.degraded_since >= self.hold_time:
+                self.degraded = False
+
+                LOG.warning("RPC audit resumed building complete events (queue depth: %d, latency: %.1f ms)",
+                            self.queue_depth, self.latency * 1000)
+        elif self.queue_depth >= self.max_queue_depth or self.latency >= self.max_latency:
+            self.degraded = True
+            self.degraded_since = time.monotonic()
+            self.activations += 1
+
+            LOG.warning("RPC audit is overloaded, building essential events only (queue depth: %d, latency: %.1f ms)",
+                        self.queue_depth, self.latency * 1000)
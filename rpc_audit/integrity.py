@@ -0,0 +1,601 @@
+import atexit
+import errno
+import fcntl
+import hmac
+import json
+import os
+import sys
+import time
+from hashlib import sha256
+from threading import Lock
+from typing import Iterator, List, Optional, Sequence, Tuple, Union
+
+from .base import EVENT_FILE, INTEGRITY_LOGS, LOG
+from .segments import SEAL_SUFFIX, open_segment, rotation_order
+
+# Chain value before the first event
+GENESIS = bytes(32)
+
+
+def leaf_hash(line: bytes) -> bytes:
+    """
+    Returns the digest of one event line (without line break).
+    Leaves and nodes use different prefixes, so an inner node can never be passed off as an event.
+    """
+    return sha256(b'\x00' + line).digest()
+
+
+def node_hash(left: bytes, right: bytes) -> bytes:
+    return sha256(b'\x01' + left + right).digest()
+
+
+def chain_hash(chain: bytes, leaf: bytes) -> bytes:
+    return sha256(chain + leaf).digest()
+
+
+def merkle_levels(leaves: List[bytes]) -> List[List[bytes]]:
+    """
+    Returns all levels of the Merkle tree, starting with the leaves.
+    If a level has an odd number of nodes, the last node is moved up unchanged.
+    """
+
+    levels = [leaves]
+
+    while len(levels[-1]) > 1:
+        level = levels[-1]
+        next_level = [node_hash(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+
+        if len(level) % 2:
+            next_level.append(level[-1])
+
+        levels.append(next_level)
+
+    return levels
+
+
+def merkle_root(leaves: List[bytes]) -> bytes:
+    return merkle_levels(leaves)[-1][0] if leaves else GENESIS
+
+
+def merkle_path(leaves: List[bytes], index: int) -> List[Tuple[str, str]]:
+    """
+    Returns the inclusion proof for a leaf: the sibling hashes from the leaf up to the root.
+    Every entry contains the side of the sibling ('L' or 'R') and its hex digest.
+    """
+
+    path = []
+
+    for level in merkle_levels(leaves)[:-1]:
+        sibling = index ^ 1
+
+        if sibling < len(level):
+            path.append(('L' if sibling < index else 'R', level[sibling].hex()))
+
+        index //= 2
+
+    return path
+
+
+def root_from_path(leaf: bytes, path: List[Tuple[str, str]]) -> bytes:
+    node = leaf
+
+    for side, sibling in path:
+        if side == 'L':
+            node = node_hash(bytes.fromhex(sibling), node)
+        else:
+            node = node_hash(node, bytes.fromhex(sibling))
+
+    return node
+
+
+def seal_payload(seal: dict) -> bytes:
+    """
+    Returns the canonical form of a seal, that is hashed and signed.
+    """
+    return json.dumps({k: v for k, v in seal.items() if k != 'hmac'}, sort_keys=True, separators=(',', ':')).encode()
+
+
+def seal_digest(seal: dict) -> str:
+    return sha256(seal_payload(seal)).hexdigest()
+
+
+def seal_hmac(seal: dict, key: bytes) -> str:
+    return hmac.new(key, seal_payload(seal), sha256).hexdigest()
+
+
+def read_seals(seal_path: str) -> List[dict]:
+    if not os.path.exists(seal_path):
+        return []
+
+    with open(seal_path) as seal_file:
+        return [json.loads(line) for line in seal_file if line.strip()]
+
+
+class IntegrityLog:
+    """
+    Writes the events to the event file and makes later modifications detectable.
+
+    The digest of every event line is chained with the digest of the previous events. After `batch_size` events (or
+    `max_delay` seconds), the batch is sealed: a seal record containing the Merkle root of the batch, the current
+    chain value and the digest of the previous seal is appended to the seal file, optionally signed with an HMAC key.
+    Only one hash per event is computed on the write path, the tree is built once per batch.
+
+    Every event file (segment) has its own seals: `first` (index of the first event) and `end` (position after the
+    last event) refer to the segment of the seal. If the event file has been rotated (renamed or truncated), which is
+    checked on start and after every seal, a new segment is started with a seal without events. The hash chain and
+    the seals continue across the segments, so the rotated files can be verified together with `verify_log`.
+
+    The log must be the only writer of the event file: the event file and the seal file are locked exclusively, a
+    second log for the same files fails with an OSError. Every process needs its own event file, e.g. with the name
+    of the service. Within a process, all environments writing to `base.EVENT_FILE` use the log for that file, even
+    if their `CADFBuildingEnv.integrity` is not set.
+
+    To use the log, set `CADFBuildingEnv.integrity` to an instance.
+    """
+
+    def __init__(self, path: str = EVENT_FILE, seal_path: Optional[str] = None, batch_size: int = 1024,
+                 max_delay: float = 10.0, key: Optional[bytes] = None):
+        """
+        :param path: The event file.
+        :param seal_path: The seal file. Default: the event file with the suffix ".seals".
+        :param batch_size: Maximum number of events in one sealed batch.
+        :param max_delay: Maximum time in seconds, before a written event is sealed. Checked on every write.
+        :param key: Optional HMAC key to sign the seals.
+        """
+
+        self.path = path
+        self.seal_path = seal_path or path + SEAL_SUFFIX
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.key = key
+
+        self.lock = Lock()
+        self.leaves: List[bytes] = []
+        self.batch_start = None
+
+        self.seal_file = open(self.seal_path, 'a')
+        self._lock(self.seal_file, self.seal_path)
+
+        seals = read_seals(self.seal_path)
+
+        if seals:
+            last = seals[-1]
+            self.segment = last.get('segment', 0)
+            self.inode = last.get('inode')
+            self.index = last['first'] + last['count']
+            self.offset = last['end']
+            self.chain = bytes.fromhex(last['chain'])
+            self.prev = seal_digest(last)
+            self.seal_number = last['seal'] + 1
+        else:
+            self.segment = 0
+            self.inode = None
+            self.index = 0
+            self.offset = 0
+            self.chain = GENESIS
+            self.prev = None
+            self.seal_number = 0
+
+        try:
+            self._open()
+        except OSError:
+            self.seal_file.close()
+            raise
+
+        INTEGRITY_LOGS[os.path.abspath(self.path)] = self
+        atexit.register(self.close)
+
+    @staticmethod
+    def _lock(file, path: str):
+        """
+        Locks a file exclusively for this log, or closes it and raises an OSError if another writer holds the lock.
+        """
+
+        try:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError as e:
+            file.close()
+            raise OSError(errno.EBUSY, "Locked by another integrity log, every process needs its own event file ({})"
+                          .format(e.strerror), path)
+
+    def _open(self):
+        """
+        Opens the event file and starts a new segment, if it is not the file of the last seal anymore.
+        """
+
+        self.event_file = open(self.path, 'ab')
+        self._lock(self.event_file, self.path)
+        status = os.fstat(self.event_file.fileno())
+
+        if status.st_size < self.offset or self.inode not in (None, status.st_ino):
+            LOG.warning("%s has been rotated, starting seal segment %d", self.path, self.segment + 1)
+
+            self.segment += 1
+            self.index = 0
+            self.offset = 0
+            self.inode = status.st_ino
+
+            # Marks the start of the segment, so every segment has at least one seal
+            self._write_seal()
+
+        self.inode = status.st_ino
+        self._recover()
+
+    def _check_rotation(self):
+        try:
+            status = os.stat(self.path)
+        except FileNotFoundError:
+            status = None
+
+        if status is None or status.st_ino != self.inode or status.st_size < self.offset:
+            self.event_file.close()
+            self._open()
+
+    def _recover(self):
+        """
+        Adds events, that have been written after the last seal (e.g. before a crash), to the current batch.
+        """
+
+        line = None
+
+        with open(self.path, 'rb') as event_file:
+            event_file.seek(self.offset)
+
+            for line in event_file:
+                self._add(line.rstrip(b'\n'))
+
+        if line is not None and not line.endswith(b'\n'):
+            # The last event has only been written partially. The fragment is sealed unchanged, but must be
+            # terminated, so the next event starts on a new line.
+            LOG.warning("Found a partially written event in %s", self.path)
+
+            self.event_file.write(b'\n')
+            self.event_file.flush()
+
+        if self.leaves:
+            LOG.warning("Found %d unsealed events in %s, adding them to the next seal", len(self.leaves), self.path)
+
+    def _add(self, line: bytes):
+        leaf = leaf_hash(line)
+
+        self.chain = chain_hash(self.chain, leaf)
+        self.leaves.append(leaf)
+
+        if self.batch_start is None:
+            self.batch_start = time.monotonic()
+
+    def write(self, line: str):
+        """
+        Writes one event line (without line break) to the event file.
+        """
+
+        data = line.encode('utf-8')
+
+        with self.lock:
+            self.event_file.write(data + b'\n')
+            self.event_file.flush()
+
+            self._add(data)
+
+            if len(self.leaves) >= self.batch_size or time.monotonic() - self.batch_start >= self.max_delay:
+                self._seal()
+
+    def seal(self):
+        """
+        Seals all events, that have not been sealed yet.
+        """
+
+        with self.lock:
+            self._seal()
+
+    def _seal(self):
+        if not self.leaves:
+            return
+
+        self._write_seal()
+        self._check_rotation()
+
+    def _write_seal(self):
+        # The seal must not refer to events, that are not persisted yet
+        self.event_file.flush()
+        end = self.event_file.tell() if self.leaves else self.offset
+
+        seal = {
+            'seal': self.seal_number,
+            'segment': self.segment,
+            'inode': self.inode,
+            'first': self.index,
+            'count': len(self.leaves),
+            'end': end,
+            'root': merkle_root(self.leaves).hex(),
+            'chain': self.chain.hex(),
+            'prev': self.prev,
+            'time': time.time(),
+        }
+
+        if self.key is not None:
+            seal['hmac'] = seal_hmac(seal, self.key)
+
+        self.seal_file.write(json.dumps(seal, separators=(',', ':')))
+        self.seal_file.write('\n')
+        self.seal_file.flush()
+
+        self.index += len(self.leaves)
+        self.offset = end
+        self.prev = seal_digest(seal)
+        self.seal_number += 1
+        self.leaves = []
+        self.batch_start = None
+
+    def close(self):
+        """
+        Seals the remaining events and closes the files.
+        """
+
+        with self.lock:
+            if self.seal_file.closed:
+                return
+
+            if self.leaves:
+                self._write_seal()
+            self.event_file.close()
+            self.seal_file.close()
+
+            if INTEGRITY_LOGS.get(os.path.abspath(self.path)) is self:
+                del INTEGRITY_LOGS[os.path.abspath(self.path)]
+
+
+def read_lines(path: str) -> Iterator[bytes]:
+    with open_segment(path) as event_file:
+        for line in event_file:
+            yield line.rstrip(b'\n')
+
+
+def group_segments(seals: List[dict]) -> List[List[dict]]:
+    """
+    Splits the seals into the seals of every segment, from the oldest to the newest segment.
+    """
+
+    segments = []
+
+    for seal in seals:
+        if not segments or segments[-1][-1].get('segment', 0) != seal.get('segment', 0):
+            segments.append([])
+
+        segments[-1].append(seal)
+
+    return segments
+
+
+class VerificationResult:
+    """
+    Result of the verification of an event file.
+    """
+
+    def __init__(self):
+        self.events = 0
+        self.seals = 0
+        self.unsealed = 0
+        self.unchecked = 0
+        self.errors: List[str] = []
+
+    @property
+    def valid(self) -> bool:
+        return not self.errors
+
+    def format(self) -> str:
+        lines = ["{} events in {} seals, {} unsealed events".format(self.events, self.seals, self.unsealed)]
+
+        if self.unchecked:
+            lines.append("{} events of older segments without event file have not been checked".format(self.unchecked))
+
+        lines += ["ERROR: {}".format(error) for error in self.errors]
+        lines.append("valid" if self.valid else "INVALID")
+
+        return '\n'.join(lines)
+
+
+def verify_log(paths: Union[str, Sequence[str]], seal_path: Optional[str] = None,
+               key: Optional[bytes] = None) -> VerificationResult:
+    """
+    Verifies all events of an event file, or of the segments of a rotated event file, against the seals.
+
+    The given files are the newest segments. Older segments may have been deleted by the rotation, only their seals
+    are checked then.
+
+    :param paths: The event file, or its segments sorted from the oldest to the newest (see `rotation_order`).
+    :param seal_path: The seal file. Default: the newest event file with the suffix ".seals".
+    :param key: If given, the HMAC of every seal is verified.
+    """
+
+    if isinstance(paths, str):
+        paths = [paths]
+
+    result = VerificationResult()
+    segments = group_segments(read_seals(seal_path or paths[-1] + SEAL_SUFFIX))
+
+    # Files older than the first segment have never been sealed
+    first_file = len(segments) - len(paths)
+
+    for path in paths[:max(0, -first_file)]:
+        result.unsealed += sum(1 for _ in read_lines(path))
+
+    chain = GENESIS
+    prev = None
+
+    for number, seals in enumerate(segments):
+        lines = read_lines(paths[number - first_file]) if number >= first_file else None
+        index = 0
+
+        for seal in seals:
+            name = "seal {} (segment {}, events {}-{})".format(seal['seal'], seal.get('segment', 0), seal['first'],
+                                                               seal['first'] + seal['count'] - 1)
+
+            if seal['prev'] != prev:
+                result.errors.append("{}: does not follow the previous seal".format(name))
+
+            if key is not None and not hmac.compare_digest(seal.get('hmac', ''), seal_hmac(seal, key)):
+                result.errors.append("{}: invalid HMAC".format(name))
+
+            prev = seal_digest(seal)
+            result.seals += 1
+
+            if lines is None:
+                # The event file of the segment has been deleted, continue with the sealed chain value
+                chain = bytes.fromhex(seal['chain'])
+                result.unchecked += seal['count']
+                continue
+
+            if seal['first'] != index:
+                result.errors.append("{}: expected first event {}".format(name, index))
+
+            leaves = []
+
+            for line in lines if seal['count'] else ():
+                leaf = leaf_hash(line)
+                chain = chain_hash(chain, leaf)
+                leaves.append(leaf)
+
+                if len(leaves) == seal['count']:
+                    break
+
+            if len(leaves) != seal['count']:
+                result.errors.append("{}: {} events are missing".format(name, seal['count'] - len(leaves)))
+            elif merkle_root(leaves).hex() != seal['root']:
+                result.errors.append("{}: events have been modified (Merkle root does not match)".format(name))
+
+            if chain.hex() != seal['chain']:
+                result.errors.append("{}: hash chain does not match".format(name))
+
+                # Continue with the sealed chain value, to check the following seals independently
+                chain = bytes.fromhex(seal['chain'])
+
+            index += len(leaves)
+            result.events += len(leaves)
+
+        if lines is not None:
+            result.unsealed += sum(1 for _ in lines)
+
+    return result
+
+
+def prove(path: str, index: int, seal_path: Optional[str] = None, segment: Optional[int] = None) -> dict:
+    """
+    Creates an inclusion proof for one event.
+
+    The proof contains the event line, the sibling hashes up to the Merkle root of its batch and the seal of the batch.
+    It can be checked with `verify_proof` without access to the event file.
+
+    :param path: The event file.
+    :param index: The index (line number, starting with 0) of the event.
+    :param seal_path: The seal file. Default: the event file with the suffix ".seals".
+    :param segment: The segment of the event file. Default: the newest segment.
+    """
+
+    segments = group_segments(read_seals(seal_path or path + SEAL_SUFFIX))
+
+    if segment is not None:
+        segments = [seals for seals in segments if seals[0].get('segment', 0) == segment]
+
+    for seal in segments[-1] if segments else ():
+        if seal['first'] <= index < seal['first'] + seal['count']:
+            break
+    else:
+        raise ValueError("Event {} has not been sealed".format(index))
+
+    leaves = []
+    event = None
+
+    for i, line in enumerate(read_lines(path)):
+        if i >= seal['first'] + seal['count']:
+            break
+
+        if i >= seal['first']:
+            leaves.append(leaf_hash(line))
+
+            if i == index:
+                event = line.decode('utf-8')
+
+    return {
+        'index': index,
+        'event': event,
+        'path': merkle_path(leaves, index - seal['first']),
+        'seal': seal,
+    }
+
+
+def verify_proof(proof: dict, key: Optional[bytes] = None) -> bool:
+    """
+    Verifies an inclusion proof in O(log n).
+
+    Without key, only the consistency of the event with the root in the seal is checked. The root must then be
+    compared with a trusted copy of the seal.
+
+    :param proof: Proof created by `prove`.
+    :param key: If given, the HMAC of the seal is verified.
+    """
+
+    seal = proof['seal']
+
+    if key is not None and not hmac.compare_digest(seal.get('hmac', ''), seal_hmac(seal, key)):
+        return False
+
+    leaf = leaf_hash(proof['event'].encode('utf-8'))
+
+    return root_from_path(leaf, proof['path']).hex() == seal['root']
+
+
+def read_key(args) -> Optional[bytes]:
+    if args.key_file is None:
+        return None
+
+    with open(args.key_file, 'rb') as key_file:
+        return key_file.read().strip()
+
+
+def run_verify(args):
+    result = verify_log(rotation_order(args.logs), args.seals, read_key(args))
+
+    print(result.format())
+
+    return 0 if result.valid else 1
+
+
+def run_prove(args):
+    proof = prove(args.log, args.index, args.seals, args.segment)
+    valid = verify_proof(proof, read_key(args))
+
+    print(json.dumps(proof, indent=2))
+    print("valid" if valid else "INVALID", file=sys.stderr)
+
+    return 0 if valid else 1
+
+
+def run_verify_proof(args):
+    with open(args.proof) as proof_file:
+        valid = verify_proof(json.load(proof_file), read_key(args))
+
+    print("valid" if valid else "INVALID")
+
+    return 0 if valid else 1
+
+
+def add_parser(subparsers):
+    parser = subparsers.add_parser('verify', help="Verify an event file against its seals")
+    parser.add_argument('logs', nargs='+', help="The event file and optionally its rotated segments")
+    parser.add_argument('--seals', help="The seal file (default: <newest log>.seals)")
+    parser.add_argument('--key-file', help="File with the HMAC key of the seals")
+    parser.set_defaults(func=run_verify)
+
+    parser = subparsers.add_parser('prove', help="Create and check an inclusion proof for one event")
+    parser.add_argument('log', help="The event file")
+    parser.add_argument('index', type=int, help="Line number of the event, starting with 0")
+    parser.add_argument('--seals', help="The seal file (default: <log>.seals)")
+    parser.add_argument('--segment', type=int, help="Segment of a rotated event file (default: the newest segment)")
+    parser.add_argument('--key-file', help="File with the HMAC key of the seals")
+    parser.set_defaults(func=run_prove)
+
+    parser = subparsers.add_parser('verify-proof', help="Check an inclusion proof created by 'prove'")
+    parser.add_argument('proof', help="File with the proof (JSON)")
+    parser.add_argument('--key-file', help="File with the HMAC key of the seals")
+    parser.set_defaults(func=run_verify_proof)
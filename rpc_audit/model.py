@@ -0,0 +1,245 @@
+"""
+Lightweight internal event model.
+
+The classes have the same attributes and `as_dict` output as the according pycadf classes, but store their attributes
+in slots and do not validate them. Repeated strings (actions, typeURIs, names) are interned. Conversion to pycadf
+objects (and thereby validation) only happens, if `to_cadf` is called.
+"""
+import logging
+import sys
+from abc import ABC, abstractmethod
+from typing import Any, List, Optional, Tuple
+
+from oslo_serialization import jsonutils
+from pycadf import attachment, credential, event, host, resource, timestamp
+from pycadf.cadftaxonomy import UNKNOWN
+from pycadf.cadftype import EVENTTYPE_ACTIVITY
+from pycadf.identifier import generate_uuid
+from pycadf.utils import mask_value
+
+LOG = logging.getLogger('rpc_audit')
+
+
+def intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if type(value) == str else value
+
+
+def to_primitive(value: Any) -> Any:
+    """
+    Converts a value into JSON compatible data.
+    """
+
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+
+    if isinstance(value, dict):
+        return {k: to_primitive(v) for k, v in value.items()}
+
+    if isinstance(value, (list, tuple)):
+        return [to_primitive(v) for v in value]
+
+    as_dict = getattr(value, 'as_dict', None)
+
+    if as_dict is not None:
+        return as_dict()
+
+    return jsonutils.to_primitive(value, convert_instances=True)
+
+
+def to_cadf(value: Any) -> Any:
+    """
+    Converts a record into the according pycadf object, other values are returned unchanged.
+    """
+
+    return value.to_cadf() if isinstance(value, Record) else value
+
+
+class Record(ABC):
+    """
+    Base class of all records. Unset (None) attributes and empty lists are omitted in the `as_dict` output.
+    """
+
+    __slots__ = ()
+
+    # The attributes in the order of the `as_dict` output
+    keys: Tuple[str, ...] = ()
+
+    def as_dict(self) -> dict:
+        result = {}
+
+        for key in self.keys:
+            value = getattr(self, key)
+
+            if value is not None and not (type(value) == list and not value):
+                result[key] = to_primitive(value)
+
+        return result
+
+    @abstractmethod
+    def to_cadf(self):
+        """
+        Converts the record into the according pycadf object.
+        """
+
+    def __eq__(self, other):
+        return type(self) == type(other) and all(getattr(self, k) == getattr(other, k) for k in self.keys)
+
+    def __repr__(self):
+        return '{}({})'.format(type(self).__name__, self.as_dict())
+
+
+class Host(Record):
+    __slots__ = keys = ('id', 'address', 'agent', 'platform')
+
+    def __init__(self, id=None, address=None, agent=None, platform=None):
+        self.id = id
+        self.address = address
+        self.agent = agent
+        self.platform = platform
+
+    def to_cadf(self) -> host.Host:
+        return host.Host(self.id, self.address, self.agent, self.platform)
+
+
+class Credential(Record):
+    __slots__ = keys = ('token', 'type')
+
+    def __init__(self, token, type=None):
+        # Like in pycadf, only a masked version of the token is stored
+        self.token = mask_value(token)
+        self.type = intern(type)
+
+    def to_cadf(self) -> credential.Credential:
+        # The pycadf constructor would mask the already masked token again
+        cadf_credential = credential.Credential.__new__(credential.Credential)
+        cadf_credential.token = self.token
+
+        if self.type is not None:
+            cadf_credential.type = self.type
+
+        return cadf_credential
+
+
+class Resource(Record):
+    __slots__ = keys = ('id', 'typeURI', 'name', 'ref', 'domain', 'credential', 'host', 'geolocationId')
+
+    def __init__(self, id=None, typeURI=UNKNOWN, name=None, ref=None, domain=None, credential=None, host=None,
+                 geolocationId=None):
+        self.id = id or generate_uuid()
+        self.typeURI = intern(typeURI)
+        self.name = name
+        self.ref = ref
+        self.domain = intern(domain)
+        self.credential = credential
+        self.host = host
+        self.geolocationId = geolocationId
+
+    def to_cadf(self) -> resource.Resource:
+        return resource.Resource(self.id, self.typeURI, self.name, self.ref, self.domain, to_cadf(self.credential),
+                                 to_cadf(self.host), geolocationId=self.geolocationId)
+
+
+class Attachment(Record):
+    __slots__ = keys = ('typeURI', 'content', 'name')
+
+    def __init__(self, typeURI=None, content=None, name=None):
+        self.typeURI = intern(typeURI)
+        self.content = content
+        self.name = intern(name)
+
+    def to_cadf(self) -> attachment.Attachment:
+        return attachment.Attachment(self.typeURI, self.content, self.name)
+
+
+class Event(Record):
+    """
+    Internal representation of a CADF event.
+    """
+
+    __slots__ = keys = ('typeURI', 'eventType', 'id', 'eventTime', 'action', 'outcome', 'observer', 'observerId',
+                        'initiator', 'initiatorId', 'target', 'targetId', 'name', 'severity', 'reason',
+                        'attachments', 'tags', 'measurements', 'reporterchain')
+
+    def __init__(self, eventType=EVENTTYPE_ACTIVITY, id=None, eventTime=None, action=UNKNOWN, outcome=UNKNOWN,
+                 initiator=None, initiatorId=None, target=None, targetId=None, severity=None, reason=None,
+                 observer=None, observerId=None, name=None, attachments=None, tags=None, measurements=None,
+                 reporterchain=None, typeURI=event.TYPE_URI_EVENT):
+        self.typeURI = intern(typeURI)
+        self.eventType = intern(eventType)
+        self.id = id or generate_uuid()
+        self.eventTime = eventTime or timestamp.get_utc_now()
+        self.action = intern(action)
+        self.outcome = intern(outcome)
+        self.observer = observer
+        self.observerId = observerId
+        self.initiator = initiator
+        self.initiatorId = initiatorId
+        self.target = target
+        self.targetId = targetId
+        self.name = name
+        self.severity = severity
+        self.reason = reason
+        self.attachments = attachments or []
+        self.tags = tags or []
+        self.measurements = measurements or []
+        self.reporterchain = reporterchain or []
+
+    def copy(self, **attributes) -> 'Event':
+        """
+        Returns a shallow copy of the event with some attributes replaced.
+        The list attributes are copied, so they can be changed without changing this event.
+        """
+
+        copy = Event.__new__(Event)
+
+        for key in self.keys:
+            value = attributes.get(key, getattr(self, key))
+            setattr(copy, key, list(value) if type(value) == list else value)
+
+        return copy
+
+    def to_cadf(self) -> event.Event:
+        """
+        Converts the event into a pycadf event. Raises a ValueError, if the event is not valid.
+        """
+
+        cadf_event = event.Event(self.eventType, self.id, self.eventTime, self.action, self.outcome,
+                                 to_cadf(self.initiator), self.initiatorId, to_cadf(self.target), self.targetId,
+                                 self.severity, to_cadf(self.reason), to_cadf(self.observer), self.observerId,
+                                 self.name)
+
+        for item in self.attachments:
+            cadf_event.add_attachment(to_cadf(item))
+
+        for item in self.tags:
+            cadf_event.add_tag(item)
+
+        for item in self.measurements:
+            cadf_event.add_measurement(to_cadf(item))
+
+        for item in self.reporterchain:
+            cadf_event.add_reporterstep(to_cadf(item))
+
+        return cadf_event
+
+
+def validate_events(events: List[Event]) -> List[Event]:
+    """
+    Validates a batch of events against the CADF model by converting them into pycadf events.
+
+    :param events: The events, that should be validated.
+    :return: The valid events, invalid events are logged and removed.
+    """
+
+    valid = []
+
+    for item in events:
+        try:
+            if item.to_cadf().is_valid():
+                valid.append(item)
+            else:
+                LOG.error("Invalid event, required attributes are missing: %s", item.as_dict())
+        except (ValueError, TypeError) as e:
+            LOG.error("Invalid event: %s | Data: %s", e, item.as_dict())
+
+    return valid
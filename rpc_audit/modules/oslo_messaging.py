@@ -1,14 +1,12 @@
-from pycadf.attachment import Attachment
 from pycadf.cadftaxonomy import UNKNOWN, OUTCOME_SUCCESS, ACCOUNT_USER, OUTCOME_FAILURE
-from pycadf.credential import Credential
 from pycadf.event import EVENT_KEYNAME_ACTION, EVENT_KEYNAME_OUTCOME, EVENT_KEYNAME_INITIATOR, \
     EVENT_KEYNAME_ATTACHMENTS, EVENT_KEYNAME_TARGET, EVENT_KEYNAME_OBSERVER, EVENT_KEYNAME_TAGS
-from pycadf.host import Host
-from pycadf.resource import Resource
 
 
-from .oslo_messaging_map import rpc_method_to_cadf_action
-from ..base import CADFBuildingEnv, BuilderType, LOG
+from .oslo_messaging_map import action_map
+from ..base import CADFBuildingEnv, BuilderType, BuilderPriority, LOG
+from ..model import Attachment, Credential, Host, Resource
+from ..router import CADFRouter
 
 builder = CADFBuildingEnv()
 
@@ -19,22 +17,17 @@ builder = CADFBuildingEnv()
 def build_action(context, method, args, role, result=None):
     """
     Tries to find an fitting action for the method.
-    To achieve this, the topic of the MQ is used to lookup the action in a map.
+    To achieve this, the topic of the MQ is used to lookup the action in the action map.
     """
 
     topic = context['target'].topic
 
     LOG.debug("topic: %s", topic)
 
-    submap = rpc_method_to_cadf_action.get(topic)
+    action = action_map.lookup(topic, method)
 
-    LOG.debug("submap: %s", submap)
-
-    if submap is not None:
-        action = submap.get(method)
-
-        if action is not None:
-            return action
+    if action is not None:
+        return action
 
     return UNKNOWN
 
@@ -120,26 +113,42 @@ def build_observer(context, method, args, role, result=None):
     return Resource(id, type_uri)
 
 
+# Appended attachments are put in front of the existing attachments,
+# so the attachment builders are registered in the reverse order of their attachments.
+
 @builder.builder(EVENT_KEYNAME_ATTACHMENTS, BuilderType.APPEND)
-def build_attachments(context, method, args, role, result=None):
+def build_request_id_attachment(context, method, args, role, result=None):
     """
-    Builds the following attachments:
-    - Information about the project
-    - A hash of the method and arguments
-    - Information about the permissions of the initiator
+    Adds the request id as attachment.
     """
 
-    attachments = [Attachment(name='project', typeURI="python/dict", content={
-        'id': context['ctxt'].project_id,
-        'name': context['ctxt'].project_name,
-        'domain': context['ctxt'].project_domain
-    }), Attachment(name='permissions', typeURI="python/dict", content={
+    return [Attachment(name="request_id", typeURI="python/str", content=context['ctxt'].request_id)]
+
+
+@builder.builder(EVENT_KEYNAME_ATTACHMENTS, BuilderType.APPEND, BuilderPriority.ENRICHMENT)
+def build_permissions_attachment(context, method, args, role, result=None):
+    """
+    Adds information about the permissions of the initiator as attachment.
+    """
+
+    return [Attachment(name='permissions', typeURI="python/dict", content={
         'is_admin': context['ctxt'].is_admin,
         'is_admin_project': context['ctxt'].is_admin_project,
         'roles': context['ctxt'].roles
-    }), Attachment(name="request_id", typeURI="python/str", content=context['ctxt'].request_id)]
+    })]
+
+
+@builder.builder(EVENT_KEYNAME_ATTACHMENTS, BuilderType.APPEND)
+def build_project_attachment(context, method, args, role, result=None):
+    """
+    Adds information about the project as attachment.
+    """
 
-    return attachments
+    return [Attachment(name='project', typeURI="python/dict", content={
+        'id': context['ctxt'].project_id,
+        'name': context['ctxt'].project_name,
+        'domain': context['ctxt'].project_domain
+    })]
 
 
 @builder.builder(EVENT_KEYNAME_TAGS, BuilderType.APPEND)
@@ -158,3 +167,7 @@ builder.filter_args = {
         }
     }
 }
+
+# Router that only audits the topics for which actions are known, including topics added by reloading the map.
+router = CADFRouter()
+router.register_topics(builder, lambda: action_map.topics)
@@ -1,94 +1,9 @@
+import os
 
-rpc_method_to_cadf_action = {
-    'compute': {
-        'add_aggregate_host': 'configure',
-        'add_fixed_ip_to_instance': 'configure',
-        'attach_interface': 'configure',
-        'attach_volume': 'configure',
-        'change_instance_metadata': 'configure',
-        'check_can_live_migrate_destination': 'read',
-        'check_can_live_migrate_source': 'read',
-        'check_instance_shared_storage': 'read',
-        'confirm_resize': 'update',
-        'detach_interface': 'configure',
-        'detach_volume': 'configure',
-        'finish_resize': 'update',
-        'finish_revert_resize': 'update',
-        'get_console_output': 'read',
-        'get_console_pool_info': 'read',
-        'get_console_topic': 'read',
-        'get_diagnostics': 'read',
-        'get_instance_diagnostics': 'read',
-        'get_vnc_console': 'read',
-        'get_spice_console': 'read',
-        'get_rdp_console': 'read',
-        'get_mks_console': 'read',
-        'get_serial_console': 'read',
-        'validate_console_port': 'read',
-        'host_maintenance_mode': 'update',
-        'host_power_action': 'update',
-        'download_host_certificate': 'read',
-        'inject_network_info': 'update',
-        'live_migration': 'start',
-        'live_migration_force_complete': 'start',
-        'live_migration_abort': 'stop',
-        'pause_instance': 'stop',
-        'post_live_migration_at_destination': 'start',
-        'pre_live_migration': 'start',
-        'prep_resize': 'update',
-        'reboot_instance': 'start',
-        'rebuild_instance': 'deploy',
-        'remove_aggregate_host': 'configure',
-        'remove_fixed_ip_from_instance': 'configure',
-        'remove_volume_connection': 'configure',
-        'rescue_instance': 'restore',
-        'reset_network': 'restore',
-        'resize_instance': 'update',
-        'resume_instance': 'start',
-        'revert_resize': 'update',
-        'rollback_live_migration_at_destination': 'undeploy',
-        'set_admin_password': 'update',
-        'set_host_enabled': 'update',
-        'swap_volume': 'update',
-        'get_host_uptime': 'read',
-        'reserve_block_device_name': 'update',
-        'backup_instance': 'backup',
-        'snapshot_instance': 'capture',
-        'start_instance': 'start',
-        'spawn_instance': 'deploy',
-        'stop_instance': 'stop',
-        'suspend_instance': 'stop',
-        'terminate_instance': 'delete',
-        'unpause_instance': 'start',
-        'unrescue_instance': 'update',
-        'soft_delete_instance': 'delete',
-        'restore_instance': 'restore',
-        'shelve_instance': 'stop',
-        'shelve_offload_instance': 'stop',
-        'unshelve_instance': 'start',
-        'volume_snapshot_create': 'capture',
-        'volume_snapshot_delete': 'delete',
-        'external_instance_event': 'update',
-        'build_and_run_instance': 'create',
-        'quiesce_instance': 'update',
-        'unquiesce_instance': 'update',
-        'refresh_instance_security_rules': 'update',
-        'trigger_crash_dump': 'update',
-    },
-    'scheduler': {
-        'select_destinations': 'read',
-        'update_aggregates': 'update',
-        'delete_aggregate': 'delete',
-        'update_instance_info': 'update',
-        'delete_instance_info': 'delete',
-        'sync_instance_info': 'configure',
-    },
-    'conductor': {
-        'live_migrate_instance': 'start',
-        'migrate_server': 'deploy',
-        'build_instances': 'deploy',
-        'schedule_and_build_instances': 'deploy',
-        'unshelve_instance': 'start',
-        'rebuild_instance': 'deploy',
-    }
-}
+from ..action_map import ActionMap
+
+# The rules that map the RPC methods to CADF actions, can be changed at runtime and reloaded with
+# `action_map.reload()` or `action_map.reload_if_changed()`.
+ACTION_MAP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'oslo_messaging_map.json')
+
+action_map = ActionMap(ACTION_MAP_PATH)
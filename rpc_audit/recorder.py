@@ -0,0 +1,177 @@
+import json
+import os
+import time
+from threading import Lock
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, Optional
+
+from pycadf.utils import mask_value
+
+from .base import ObserverRole, LOG
+
+# Objects nested deeper are stored as their string representation.
+MAX_DEPTH = 6
+
+# Entries, whose names contain one of these strings (e.g. "auth_token", "new_pass", "admin_password"), are credentials
+# and only stored masked, like in the events.
+MASKED_KEY_PARTS = ('pass', 'token', 'secret')
+
+# Entries that contain credentials and are not needed to build the events are not stored at all.
+DROPPED_KEYS = frozenset(['service_catalog', 'auth_plugin', 'user_auth_plugin'])
+
+
+def is_credential(key: Any) -> bool:
+    key = str(key).lower()
+
+    return any(part in key for part in MASKED_KEY_PARTS)
+
+
+def snapshot_entry(key: Any, value: Any, depth: int) -> Any:
+    if isinstance(value, str) and is_credential(key):
+        return mask_value(value)
+
+    return snapshot_value(value, depth)
+
+
+def snapshot_value(value: Any, depth: int = 0) -> Any:
+    """
+    Converts a value into JSON compatible data.
+
+    Credentials (see `MASKED_KEY_PARTS`) are masked, entries in `DROPPED_KEYS` are omitted. Objects are converted
+    with their `to_dict`/`as_dict`/`obj_to_primitive` method if available, otherwise with their public attributes.
+    Values that cannot be converted are stored as their string representation.
+    """
+
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+
+    if depth >= MAX_DEPTH:
+        return repr(value)
+
+    if isinstance(value, dict):
+        return {str(k): snapshot_entry(k, v, depth + 1) for k, v in value.items() if k not in DROPPED_KEYS}
+
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return [snapshot_value(v, depth + 1) for v in value]
+
+    for name in ('to_dict', 'as_dict', 'obj_to_primitive'):
+        func = getattr(value, name, None)
+
+        if callable(func):
+            try:
+                return snapshot_value(func(), depth + 1)
+            except Exception:
+                pass
+
+    if hasattr(value, '__dict__'):
+        return {k: snapshot_entry(k, v, depth + 1) for k, v in vars(value).items()
+                if not k.startswith('_') and not callable(v) and k not in DROPPED_KEYS}
+
+    return repr(value)
+
+
+def snapshot_call(context: Any, method: str, args: Optional[Dict], role: ObserverRole, result=None) -> dict:
+    """
+    Creates a compact snapshot of an RPC call, that can be written to a trace file.
+
+    The names of the context entries that were objects (and not dicts) are stored in `objects`, so they can be
+    restored as objects with attributes on replay.
+    """
+
+    context_data = {}
+    objects = []
+
+    for key, value in (context or {}).items():
+        if not isinstance(value, (dict, list, tuple, str, int, float, bool, type(None))):
+            objects.append(key)
+
+        context_data[key] = snapshot_value(value)
+
+    return {
+        'ts': time.time(),
+        'role': role.name,
+        'method': method,
+        'args': snapshot_value(args),
+        'result': snapshot_value(result),
+        'context': context_data,
+        'objects': objects,
+    }
+
+
+def restore_context(record: dict) -> dict:
+    """
+    Restores the context of a recorded RPC call. Recorded objects are restored as `SimpleNamespace` objects.
+    """
+
+    context = dict(record['context'])
+
+    for key in record.get('objects', []):
+        if isinstance(context.get(key), dict):
+            context[key] = SimpleNamespace(**context[key])
+
+    return context
+
+
+class TraceRecorder:
+    """
+    Writes snapshots of all RPC calls of an environment to a trace file (one JSON object per line).
+
+    The trace contains the arguments of the RPC calls, so a new file is only readable by its owner. Tokens are
+    masked and the service catalog is omitted.
+
+    To record the RPC calls of an environment, set `CADFBuildingEnv.recorder` to a recorder instance.
+    """
+
+    def __init__(self, path: str = '/tmp/rpc_trace.jsonl', flush_interval: float = 1.0):
+        """
+        :param path: The trace file, new records are appended.
+        :param flush_interval: Maximum time in seconds, before written records are flushed to the file.
+        """
+
+        self.path = path
+        self.flush_interval = flush_interval
+
+        self.lock = Lock()
+        self.trace_file = os.fdopen(os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600), 'a')
+        self.last_flush = time.monotonic()
+
+    def record(self, context: Any, method: str, args: Optional[Dict], role: ObserverRole, result=None):
+        """
+        Writes a snapshot of an RPC call to the trace file.
+
+        Will catch all errors and log them.
+        """
+
+        try:
+            line = json.dumps(snapshot_call(context, method, args, role, result), separators=(',', ':'))
+
+            with self.lock:
+                self.trace_file.write(line)
+                self.trace_file.write('\n')
+
+                now = time.monotonic()
+
+                if now - self.last_flush >= self.flush_interval:
+                    self.trace_file.flush()
+                    self.last_flush = now
+        except Exception as e:
+            LOG.error("Could not record RPC call: %s", e, exc_info=True)
+
+    def close(self):
+        """
+        Flushes and closes the trace file.
+        """
+
+        with self.lock:
+            self.trace_file.close()
+
+
+def read_trace(path: str) -> Iterator[dict]:
+    """
+    Reads all records from a trace file.
+    """
+
+    with open(path) as trace_file:
+        for line in trace_file:
+            if line.strip():
+                yield json.loads(line)
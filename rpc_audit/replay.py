@@ -0,0 +1,279 @@
+import importlib
+import os
+import threading
+import time
+from typing import Any, List, Optional
+
+from . import base
+from .base import ObserverRole
+from .recorder import read_trace, restore_context
+
+
+def load_env(spec: str) -> Any:
+    """
+    Imports an environment (or router) given as "module:attribute", e.g. "rpc_audit.modules.oslo_messaging:builder".
+    """
+
+    module_name, _, attr = spec.partition(':')
+
+    return getattr(importlib.import_module(module_name), attr or 'builder')
+
+
+def percentile(values: List[float], p: float) -> float:
+    """
+    Returns the p-th percentile (0-100) of sorted values.
+    """
+
+    if not values:
+        return 0.0
+
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+class ReplayReport:
+    """
+    Throughput and latency of one replay run.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.skipped = 0
+        self.errors = 0
+        self.elapsed = 0.0
+        self.latencies: List[float] = []
+        self.lock = threading.Lock()
+
+    def add(self, latency: Optional[float], error: bool = False, skipped: bool = False):
+        with self.lock:
+            if skipped:
+                self.skipped += 1
+                return
+
+            self.calls += 1
+            self.latencies.append(latency)
+
+            if error:
+                self.errors += 1
+
+    @property
+    def throughput(self) -> float:
+        return self.calls / self.elapsed if self.elapsed else 0.0
+
+    def format(self) -> str:
+        latencies = sorted(self.latencies)
+
+        lines = [
+            "calls:      {} ({} skipped, {} errors)".format(self.calls, self.skipped, self.errors),
+            "elapsed:    {:.3f} s".format(self.elapsed),
+            "throughput: {:.1f} calls/s".format(self.throughput),
+        ]
+
+        for name, p in (('p50', 50), ('p95', 95), ('p99', 99), ('max', 100)):
+            lines.append("latency {}: {:.3f} ms".format(name, percentile(latencies, p) * 1000))
+
+        return '\n'.join(lines)
+
+
+class CompletionTracker:
+    """
+    Measures the time from the RPC call until its events are saved, if the calls are processed asynchronously.
+
+    `process_async` starts a thread that calls `build_and_save_events` of the environment, so this method is wrapped
+    for every used environment until `uninstall` is called.
+    """
+
+    def __init__(self, report: ReplayReport):
+        self.report = report
+        self.envs = []
+
+        # Start time of every call in progress, indexed by the id of its context
+        self.pending = {}
+        self.condition = threading.Condition()
+
+    def install(self, env: base.CADFBuildingEnv):
+        with self.condition:
+            if any(tracked_env is env for tracked_env in self.envs):
+                return
+
+            build_and_save_events = env.build_and_save_events
+
+            def tracked(context, *args, **kwargs):
+                try:
+                    build_and_save_events(context, *args, **kwargs)
+                finally:
+                    self.done(context)
+
+            env.build_and_save_events = tracked
+            self.envs.append(env)
+
+    def uninstall(self):
+        with self.condition:
+            for env in self.envs:
+                del env.build_and_save_events
+
+            self.envs = []
+
+    def start(self, context):
+        with self.condition:
+            self.pending[id(context)] = time.perf_counter()
+
+    def done(self, context, error: bool = False):
+        with self.condition:
+            start = self.pending.pop(id(context))
+
+            if not self.pending:
+                self.condition.notify_all()
+
+        self.report.add(time.perf_counter() - start, error=error)
+
+    def wait(self):
+        """
+        Waits until the events of all started calls have been saved.
+        """
+
+        with self.condition:
+            while self.pending:
+                self.condition.wait()
+
+
+def replay_record(env: Any, record: dict, report: ReplayReport, build_only: bool,
+                  tracker: Optional[CompletionTracker] = None):
+    context = restore_context(record)
+    method = record['method']
+    role = ObserverRole[record['role']]
+    target_env = env
+
+    if callable(getattr(env, 'route', None)):
+        # Use the same environment as the router would use
+        target_env = env.route(context, method)
+
+        if target_env is None:
+            report.add(None, skipped=True)
+            return
+
+    if tracker is not None:
+        # Goes through the same path as a real RPC call, including the router, recorder and degradation controller
+        tracker.install(target_env)
+        tracker.start(context)
+
+        call = env.rpc_called if role == ObserverRole.SENDER else env.rpc_received
+
+        try:
+            call(context, method, record['args'], record['result'])
+        except Exception:
+            tracker.done(context, error=True)
+
+        return
+
+    error = False
+    start = time.perf_counter()
+
+    try:
+        if build_only:
+            error = None in target_env.build_events(context, method, record['args'], role, record['result'])
+        else:
+            target_env.build_and_save_events(context, method, record['args'], role, record['result'])
+    except Exception:
+        error = True
+
+    report.add(time.perf_counter() - start, error=error)
+
+
+def replay(env: Any, records: List[dict], speed: float = 0, threads: int = 1, build_only: bool = False,
+           asynchronous: bool = False) -> ReplayReport:
+    """
+    Feeds recorded RPC calls into an environment or router.
+
+    The calls are processed by `threads` producer threads, every thread processes every n-th record in the recorded
+    order. By default, the events are built and saved synchronously by the producer threads.
+
+    :param env: The environment or router.
+    :param records: The records of a trace file.
+    :param speed: Replay speed relative to the recording, e.g. 1 for the recorded speed. 0 replays at maximum speed.
+    :param threads: Number of producer threads.
+    :param build_only: Only build the events instead of also saving them.
+    :param asynchronous: Call `rpc_called`/`rpc_received` like the RPC library, so the events are processed by
+                         `process_async`. The latency is measured until the events are saved.
+    :return: The report of the run.
+    """
+
+    if build_only and asynchronous:
+        raise ValueError("build_only and asynchronous can not be combined")
+
+    report = ReplayReport()
+
+    if not records:
+        return report
+
+    first_ts = records[0]['ts']
+    tracker = CompletionTracker(report) if asynchronous else None
+
+    def produce(thread_records, start):
+        for record in thread_records:
+            if speed > 0:
+                delay = start + (record['ts'] - first_ts) / speed - time.perf_counter()
+
+                if delay > 0:
+                    time.sleep(delay)
+
+            replay_record(env, record, report, build_only, tracker)
+
+    start = time.perf_counter()
+
+    workers = [threading.Thread(target=produce, args=(records[i::threads], start), daemon=True)
+               for i in range(threads)]
+
+    try:
+        for worker in workers:
+            worker.start()
+
+        for worker in workers:
+            worker.join()
+
+        if tracker is not None:
+            tracker.wait()
+    finally:
+        if tracker is not None:
+            tracker.uninstall()
+
+    report.elapsed = time.perf_counter() - start
+
+    return report
+
+
+def run(args):
+    if not args.api:
+        base.USE_API = False
+
+    base.EVENT_FILE = args.output
+
+    env = load_env(args.env)
+    records = list(read_trace(args.trace))
+
+    for i in range(args.runs):
+        report = replay(env, records, speed=args.speed, threads=args.threads, build_only=args.build_only,
+                        asynchronous=args.asynchronous)
+
+        print("Run {}/{}".format(i + 1, args.runs))
+        print(report.format())
+
+    return 0
+
+
+def add_parser(subparsers):
+    parser = subparsers.add_parser('replay', help="Replay a recorded RPC trace into an environment")
+    parser.add_argument('trace', help="Trace file written by the TraceRecorder")
+    parser.add_argument('--env', default='rpc_audit.modules.oslo_messaging:builder',
+                        help="Environment or router as module:attribute (default: %(default)s)")
+    parser.add_argument('--speed', type=float, default=0,
+                        help="Replay speed relative to the recording, 0 for maximum speed (default: %(default)s)")
+    parser.add_argument('--threads', type=int, default=1, help="Number of producer threads (default: %(default)s)")
+    parser.add_argument('--runs', type=int, default=1, help="Number of replay runs (default: %(default)s)")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--build-only', action='store_true', help="Only build the events, do not save them")
+    mode.add_argument('--async', dest='asynchronous', action='store_true',
+                      help="Process the calls with rpc_called/rpc_received in separate threads, like the RPC library")
+    parser.add_argument('--output', default=os.devnull,
+                        help="File the events are appended to (default: %(default)s, the events are discarded)")
+    parser.add_argument('--api', action='store_true', help="Send the events to the audit API")
+    parser.set_defaults(func=run)
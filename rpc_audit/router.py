@@ -0,0 +1,103 @@
+from typing import Any, Callable, Container, Dict, List, Optional, Tuple
+
+from .base import CADFBuildingEnv, LOG, get_topic
+
+
+class CADFRouter:
+    """
+    Routes RPC calls to the `CADFBuildingEnv` instance that is registered for their topic.
+
+    The router offers the same `rpc_called` and `rpc_received` methods as a `CADFBuildingEnv`, so it can be imported
+    into the RPC library instead of a single environment. This allows to run separate builder sets for every topic.
+
+    Calls for topics (and methods) without a registered environment are dropped immediately, before any event
+    data is collected or a thread is started.
+    """
+
+    def __init__(self, default: Optional[CADFBuildingEnv] = None):
+        """
+        :param default: Environment that is used if no environment is registered for a topic.
+        """
+
+        # Environments for a whole topic, indexed by topic.
+        self.topic_map: Dict[str, CADFBuildingEnv] = {}
+
+        # Environments for single methods, indexed by (topic, method).
+        self.method_map: Dict[Tuple[str, str], CADFBuildingEnv] = {}
+
+        self.default = default
+
+        # Environments with a changing set of topics, as (function returning the topics, environment).
+        self.topic_sources: List[Tuple[Callable[[], Container[str]], CADFBuildingEnv]] = []
+
+    def register(self, env: CADFBuildingEnv, topic: str, method: Optional[str] = None):
+        """
+        Registers an environment for a topic.
+
+        :param env: The environment that should process the RPC calls.
+        :param topic: The topic of the RPC target.
+        :param method: If given, the environment is only used for this method. Method registrations have priority
+                       over topic registrations.
+        """
+
+        LOG.debug("Registered environment for topic %s, method %s", topic, method)
+
+        if method is None:
+            self.topic_map[topic] = env
+        else:
+            self.method_map[(topic, method)] = env
+
+    def register_topics(self, env: CADFBuildingEnv, topics: Callable[[], Container[str]]):
+        """
+        Registers an environment for a set of topics, that can change at runtime.
+
+        :param env: The environment that should process the RPC calls.
+        :param topics: Function that returns the current topics. It is called for every call of a topic, that is not
+                       registered with `register`, so it must be cheap, e.g. `lambda: action_map.topics`.
+        """
+
+        self.topic_sources.append((topics, env))
+
+    def route(self, context: Any, method: str) -> Optional[CADFBuildingEnv]:
+        """
+        Returns the environment for the RPC call, or None if the call should not be audited.
+        """
+
+        topic = get_topic(context)
+
+        if self.method_map:
+            env = self.method_map.get((topic, method))
+
+            if env is not None:
+                return env
+
+        env = self.topic_map.get(topic)
+
+        if env is not None:
+            return env
+
+        for topics, env in self.topic_sources:
+            if topic in topics():
+                return env
+
+        return self.default
+
+    def rpc_received(self, context, method: str, args: Optional[Dict], result=None):
+        """
+        Should be called when an rpc call has been received.
+        """
+
+        env = self.route(context, method)
+
+        if env is not None:
+            env.rpc_received(context, method, args, result)
+
+    def rpc_called(self, context, method: str, args: Optional[Dict], result=None):
+        """
+        Should be called when an rpc call has been sent.
+        """
+
+        env = self.route(context, method)
+
+        if env is not None:
+            env.rpc_called(context, method, args, result)
@@ -0,0 +1,342 @@
+import json
+import mmap
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from pycadf.timestamp import TIME_FORMAT
+
+from .segments import is_compressed, open_segment, rotation_order
+
+# Default size of the chunks, that are scanned by one worker
+CHUNK_SIZE = 16 * 1024 * 1024
+
+EVENT_TIME_KEY = b'"eventTime":'
+
+# Length of the event time without the time zone, e.g. "2020-11-22T15:10:00.000000"
+EVENT_TIME_LENGTH = 26
+
+# Time zone of the event times written by pycadf
+EVENT_TIME_ZONE = b'+0000'
+
+
+def parse_time(value: str) -> datetime:
+    """
+    Parses the time of an event, or a time given on the command line (ISO format, UTC if no timezone is given).
+    """
+
+    try:
+        return datetime.strptime(value, TIME_FORMAT)
+    except ValueError:
+        time = datetime.fromisoformat(value)
+
+        return time if time.tzinfo is not None else time.replace(tzinfo=timezone.utc)
+
+
+def utc(time: Optional[datetime]) -> Optional[datetime]:
+    """
+    Converts a time into UTC, times without timezone are UTC.
+    """
+
+    if time is None:
+        return None
+
+    return time.astimezone(timezone.utc) if time.tzinfo is not None else time.replace(tzinfo=timezone.utc)
+
+
+class Query:
+    """
+    Predicates for the events. Only events matching all given predicates are returned.
+    """
+
+    def __init__(self, initiator_id: Optional[str] = None, target_id: Optional[str] = None,
+                 action: Optional[str] = None, outcome: Optional[str] = None, since: Optional[datetime] = None,
+                 until: Optional[datetime] = None, request_id: Optional[str] = None):
+        """
+        :param initiator_id: Id of the initiator.
+        :param target_id: Id of the target.
+        :param action: The CADF action.
+        :param outcome: The CADF outcome.
+        :param since: Only events at or after this time.
+        :param until: Only events before this time.
+        :param request_id: Content of the `request_id` attachment.
+        """
+
+        self.initiator_id = initiator_id
+        self.target_id = target_id
+        self.action = action
+        self.outcome = outcome
+        self.since = utc(since)
+        self.until = utc(until)
+        self.request_id = request_id
+
+        # Every matching line must contain these byte strings (the JSON encoded values). Checking them is much
+        # cheaper than parsing the line. The longest one is searched first, because it is usually the rarest.
+        values = [initiator_id, target_id, action, outcome, request_id]
+        self.needles = sorted({json.dumps(value).encode('utf-8') for value in values if value is not None},
+                              key=len, reverse=True)
+
+        # The event times are written in UTC with a fixed length, so they can be compared as byte strings
+        self.time_range = None
+
+        if self.since is not None or self.until is not None:
+            self.time_range = tuple(time.strftime('%Y-%m-%dT%H:%M:%S.%f').encode('ascii') if time else None
+                                    for time in (self.since, self.until))
+
+    def in_time_range(self, line: bytes) -> bool:
+        """
+        Checks the time range of the query without parsing the line. Returns False, if the event is outside of the
+        range, True if it is inside or the event time has an unexpected format, so the line must be parsed.
+        """
+
+        if self.time_range is None:
+            return True
+
+        position = line.find(EVENT_TIME_KEY)
+
+        if position == -1:
+            return True
+
+        start = line.find(b'"', position + len(EVENT_TIME_KEY)) + 1
+        value = line[start:start + EVENT_TIME_LENGTH + len(EVENT_TIME_ZONE)]
+
+        if start > position + len(EVENT_TIME_KEY) + 2 or not value.endswith(EVENT_TIME_ZONE):
+            return True
+
+        value = value[:EVENT_TIME_LENGTH]
+        since, until = self.time_range
+
+        return (since is None or value >= since) and (until is None or value < until)
+
+    def matches(self, event: dict) -> bool:
+        if self.initiator_id is not None and (event.get('initiator') or {}).get('id') != self.initiator_id:
+            return False
+
+        if self.target_id is not None and (event.get('target') or {}).get('id') != self.target_id:
+            return False
+
+        if self.action is not None and event.get('action') != self.action:
+            return False
+
+        if self.outcome is not None and event.get('outcome') != self.outcome:
+            return False
+
+        if self.request_id is not None and not any(attachment.get('name') == 'request_id'
+                                                   and attachment.get('content') == self.request_id
+                                                   for attachment in event.get('attachments', [])):
+            return False
+
+        if self.since is not None or self.until is not None:
+            try:
+                time = parse_time(event['eventTime'])
+            except (KeyError, ValueError):
+                return False
+
+            if self.since is not None and time < self.since:
+                return False
+
+            if self.until is not None and time >= self.until:
+                return False
+
+        return True
+
+
+def match_line(line: bytes, query: Query) -> bool:
+    try:
+        event = json.loads(line)
+    except ValueError:
+        # Incomplete or damaged line
+        return False
+
+    if type(event) != dict:
+        return False
+
+    try:
+        return query.matches(event)
+    except (AttributeError, TypeError):
+        # Valid JSON, but not an event, e.g. a string as initiator
+        return False
+
+
+def scan_buffer(buffer, start: int, end: int, query: Query) -> List[bytes]:
+    """
+    Returns all matching lines in a part of a buffer. The part must start and end on line boundaries.
+
+    If the query has byte strings, that every matching line must contain, only the lines containing the first one
+    are found by searching the buffer and parsed afterwards. Lines outside of the time range are skipped without
+    parsing them.
+    """
+
+    matches = []
+
+    if not query.needles:
+        for line in bytes(buffer[start:end]).splitlines():
+            if line and query.in_time_range(line) and match_line(line, query):
+                matches.append(line)
+
+        return matches
+
+    first, others = query.needles[0], query.needles[1:]
+    position = buffer.find(first, start, end)
+
+    while position != -1:
+        # The part starts on a line boundary, so the line starts there if no line break is found
+        line_start = buffer.rfind(b'\n', start, position) + 1 or start
+        line_end = buffer.find(b'\n', position, end)
+
+        if line_end == -1:
+            line_end = end
+
+        line = buffer[line_start:line_end]
+
+        if all(needle in line for needle in others) and query.in_time_range(line) and match_line(line, query):
+            matches.append(line)
+
+        position = buffer.find(first, line_end, end)
+
+    return matches
+
+
+def scan_file_chunk(path: str, start: int, end: int, query: Query) -> List[bytes]:
+    """
+    Scans a part of an uncompressed file, runs in the worker processes.
+    """
+
+    with open(path, 'rb') as log_file, mmap.mmap(log_file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        return scan_buffer(buffer, start, end, query)
+
+
+def scan_data_chunk(data: bytes, query: Query) -> List[bytes]:
+    """
+    Scans a chunk of decompressed data, runs in the worker processes.
+    """
+
+    return scan_buffer(data, 0, len(data), query)
+
+
+def split_file(path: str, chunk_size: int) -> Iterator[Tuple[int, int]]:
+    """
+    Splits a file into chunks of about `chunk_size` bytes, that start and end on line boundaries.
+    """
+
+    size = os.path.getsize(path)
+
+    if size == 0:
+        return
+
+    with open(path, 'rb') as log_file, mmap.mmap(log_file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        start = 0
+
+        while start < size:
+            end = buffer.find(b'\n', min(start + chunk_size, size) - 1)
+            end = size if end == -1 else end + 1
+
+            yield start, end
+
+            start = end
+
+
+def read_compressed_chunks(path: str, chunk_size: int) -> Iterator[bytes]:
+    """
+    Reads a compressed file in chunks of about `chunk_size` decompressed bytes, that end on line boundaries.
+    """
+
+    rest = b''
+
+    with open_segment(path) as log_file:
+        while True:
+            data = log_file.read(chunk_size)
+
+            if not data:
+                break
+
+            data = rest + data
+            end = data.rfind(b'\n') + 1
+
+            if end == 0:
+                rest = data
+                continue
+
+            rest = data[end:]
+
+            yield data[:end]
+
+    if rest:
+        yield rest
+
+
+def scan(paths: Iterable[str], query: Query, workers: Optional[int] = None,
+         chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Scans log segments in parallel and returns the matching lines in the order of the files.
+
+    Uncompressed segments are memory mapped by the workers, compressed segments are decompressed by this process and
+    the chunks are sent to the workers.
+
+    :param paths: The log segments, sorted with `rotation_order`.
+    :param query: The predicates for the events.
+    :param workers: Number of worker processes. Default: number of CPUs.
+    :param chunk_size: Size of the chunks, that are scanned by one worker.
+    """
+
+    workers = workers or os.cpu_count() or 1
+
+    with ProcessPoolExecutor(workers) as executor:
+        # Limits the number of chunks in memory, while keeping all workers busy
+        pending = deque()
+
+        for path in paths:
+            if is_compressed(path):
+                tasks = ((scan_data_chunk, data) for data in read_compressed_chunks(path, chunk_size))
+            else:
+                tasks = ((scan_file_chunk, path, start, end) for start, end in split_file(path, chunk_size))
+
+            for func, *args in tasks:
+                pending.append(executor.submit(func, *args, query))
+
+                while len(pending) >= 2 * workers:
+                    yield from pending.popleft().result()
+
+        while pending:
+            yield from pending.popleft().result()
+
+
+def run(args):
+    query = Query(initiator_id=args.initiator, target_id=args.target, action=args.action, outcome=args.outcome,
+                  since=parse_time(args.since) if args.since else None,
+                  until=parse_time(args.until) if args.until else None, request_id=args.request_id)
+
+    count = 0
+    output = sys.stdout.buffer
+
+    for line in scan(rotation_order(args.paths), query, args.workers, args.chunk_size * 1024 * 1024):
+        count += 1
+
+        if not args.count:
+            output.write(line)
+            output.write(b'\n')
+
+    if args.count:
+        print(count)
+
+    return 0
+
+
+def add_parser(subparsers):
+    parser = subparsers.add_parser('scan', help="Search events in (rotated, compressed) event files")
+    parser.add_argument('paths', nargs='+', help="Event files (.gz, .bz2 and .xz are decompressed)")
+    parser.add_argument('--initiator', help="Id of the initiator")
+    parser.add_argument('--target', help="Id of the target")
+    parser.add_argument('--action', help="CADF action")
+    parser.add_argument('--outcome', help="CADF outcome")
+    parser.add_argument('--since', help="Only events at or after this time (ISO format, default timezone UTC)")
+    parser.add_argument('--until', help="Only events before this time (ISO format, default timezone UTC)")
+    parser.add_argument('--request-id', help="Request id (request_id attachment)")
+    parser.add_argument('--workers', type=int, help="Number of worker processes (default: number of CPUs)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE // (1024 * 1024),
+                        help="Size of the chunks per worker in MiB (default: %(default)s)")
+    parser.add_argument('--count', action='store_true', help="Only print the number of matching events")
+    parser.set_defaults(func=run)
@@ -0,0 +1,46 @@
+"""
+Helpers for rotated event files (segments), e.g. events.txt.2.gz, events.txt.1, events.txt.
+"""
+import bz2
+import gzip
+import lzma
+import os
+import re
+from typing import IO, Iterable, List
+
+# Functions to open compressed log segments, indexed by file extension
+DECOMPRESSORS = {
+    '.gz': gzip.open,
+    '.bz2': bz2.open,
+    '.xz': lzma.open,
+}
+
+# Suffix of the seal files written by `rpc_audit.integrity.IntegrityLog` next to the event files
+SEAL_SUFFIX = '.seals'
+
+ROTATION_PATTERN = re.compile(r'\.(\d+)(\.(gz|bz2|xz))?$')
+
+
+def is_compressed(path: str) -> bool:
+    return os.path.splitext(path)[1] in DECOMPRESSORS
+
+
+def open_segment(path: str) -> IO[bytes]:
+    """
+    Opens a segment for reading binary data, compressed segments are decompressed.
+    """
+
+    return DECOMPRESSORS.get(os.path.splitext(path)[1], open)(path, 'rb')
+
+
+def rotation_order(paths: Iterable[str]) -> List[str]:
+    """
+    Sorts rotated log segments from the oldest to the newest, e.g. events.txt.2.gz, events.txt.1, events.txt.
+    Seal files are skipped, so all files matching e.g. "events.txt*" can be passed.
+    """
+
+    def rotation_number(path):
+        match = ROTATION_PATTERN.search(path)
+        return int(match.group(1)) if match else 0
+
+    return sorted((path for path in paths if not path.endswith(SEAL_SUFFIX)), key=lambda path: -rotation_number(path))
@@ -0,0 +1,127 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import TestCase
+
+from rpc_audit.action_map import ActionMap, parse_rules
+from rpc_audit.modules.oslo_messaging_map import action_map
+
+
+class TestActionMap(TestCase):
+    rules = {
+        'compute': {
+            'exact': {
+                'reboot_instance': 'start',
+                'get_vnc_console': 'update',
+            },
+            'rules': [
+                {'glob': 'get_*_console', 'action': 'read'},
+                {'prefix': 'live_migration', 'action': 'start'},
+                {'regex': '(un)?pause_instance', 'action': 'stop'},
+            ]
+        },
+        '*': {
+            'exact': {
+                'ping': 'monitor',
+            },
+            'rules': [
+                {'prefix': 'delete_', 'action': 'delete'},
+            ]
+        }
+    }
+
+    def setUp(self) -> None:
+        self.map = ActionMap(rules=parse_rules(self.rules))
+
+        super(TestActionMap, self).setUp()
+
+    def test_exact(self):
+        self.assertEqual(self.map.lookup('compute', 'reboot_instance'), 'start')
+
+    def test_exact_has_priority(self):
+        self.assertEqual(self.map.lookup('compute', 'get_vnc_console'), 'update')
+
+    def test_patterns(self):
+        self.assertEqual(self.map.lookup('compute', 'get_spice_console'), 'read')
+        self.assertEqual(self.map.lookup('compute', 'live_migration_abort'), 'start')
+        self.assertEqual(self.map.lookup('compute', 'unpause_instance'), 'stop')
+        self.assertIsNone(self.map.lookup('compute', 'pause_instance_now'))
+
+    def test_any_topic(self):
+        self.assertEqual(self.map.lookup('scheduler', 'ping'), 'monitor')
+        self.assertEqual(self.map.lookup('compute', 'delete_aggregate'), 'delete')
+        self.assertEqual(set(self.map.topics), {'compute'})
+
+    def test_unmapped(self):
+        self.map.lookup('compute', 'unknown_method')
+        self.map.lookup('compute', 'unknown_method')
+
+        self.assertEqual(self.map.unmapped[('compute', 'unknown_method')], 2)
+
+    def test_invalid_rule(self):
+        with self.assertRaises(ValueError):
+            parse_rules({'compute': {'rules': [{'glob': 'get_*', 'prefix': 'get_', 'action': 'read'}]}})
+
+    def test_separate_regex_rules(self):
+        rule_map = ActionMap(rules=parse_rules({'compute': {'rules': [
+            {'regex': '(?P<verb>get)_(?P=verb)_x', 'action': 'read'},
+            {'prefix': 'live_', 'action': 'start'},
+            {'regex': '(?P<verb>set)_(?P=verb)_x', 'action': 'update'},
+            {'regex': '(?P<r0>del)_(?P=r0)', 'action': 'delete'},
+            {'regex': '(get|set)_\\1_y', 'action': 'read'},
+            {'regex': '(?i)STOP_.*', 'action': 'stop'},
+            {'glob': 'get_*', 'action': 'read'},
+        ]}}))
+
+        self.assertEqual(rule_map.lookup('compute', 'get_get_x'), 'read')
+        self.assertEqual(rule_map.lookup('compute', 'set_set_x'), 'update')
+        self.assertEqual(rule_map.lookup('compute', 'del_del'), 'delete')
+        self.assertEqual(rule_map.lookup('compute', 'set_set_y'), 'read')
+        self.assertEqual(rule_map.lookup('compute', 'stop_instance'), 'stop')
+        self.assertEqual(rule_map.lookup('compute', 'live_migration'), 'start')
+        self.assertEqual(rule_map.lookup('compute', 'get_console'), 'read')
+        self.assertIsNone(rule_map.lookup('compute', 'put_instance'))
+
+    def test_unmapped_limit(self):
+        self.map.max_unmapped = 2
+
+        for method in ('a', 'b', 'c', 'a'):
+            self.map.lookup('compute', method)
+
+        self.assertEqual(self.map.unmapped, {('compute', 'a'): 2, ('compute', 'b'): 1})
+        self.assertEqual(self.map.unmapped_other, 1)
+
+    def test_reload(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'map.json')
+
+            with open(path, 'w') as rule_file:
+                json.dump(self.rules, rule_file)
+
+            rule_map = ActionMap(path)
+            self.assertEqual(rule_map.lookup('compute', 'reboot_instance'), 'start')
+
+            with open(path, 'w') as rule_file:
+                json.dump({'compute': {'exact': {'reboot_instance': 'stop'}}}, rule_file)
+
+            os.utime(path, (0, 0))
+
+            self.assertTrue(rule_map.reload_if_changed())
+            self.assertEqual(rule_map.lookup('compute', 'reboot_instance'), 'stop')
+            self.assertFalse(rule_map.reload_if_changed())
+
+            # A missing file keeps the current rules
+            os.unlink(path)
+
+            self.assertFalse(rule_map.reload_if_changed())
+            self.assertEqual(rule_map.lookup('compute', 'reboot_instance'), 'stop')
+
+    def test_oslo_messaging_map(self):
+        self.assertEqual(action_map.lookup('compute', 'get_serial_console'), 'read')
+        self.assertEqual(action_map.lookup('conductor', 'build_instances'), 'deploy')
+        self.assertEqual(set(action_map.topics), {'compute', 'scheduler', 'conductor'})
+
+
+if __name__ == '__main__':
+    unittest.main()
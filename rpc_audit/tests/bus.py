@@ -0,0 +1,149 @@
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+import unittest
+from unittest import TestCase
+
+from rpc_audit.base import ObserverRole
+from rpc_audit.bus import EventBus, DropPolicy, serve_tail
+from rpc_audit.model import Event
+
+
+class TestEventBus(TestCase):
+    def setUp(self) -> None:
+        self.bus = EventBus()
+
+        super(TestEventBus, self).setUp()
+
+    def publish(self, action='read', role=ObserverRole.SENDER, topic='compute'):
+        event = Event(action=action)
+        self.bus.publish(event, role, topic, json.dumps(event.as_dict()))
+
+        return event
+
+    def test_shared_payload(self):
+        first = self.bus.subscribe()
+        second = self.bus.subscribe()
+
+        event = self.publish()
+
+        first_envelope, second_envelope = first.get(0), second.get(0)
+
+        self.assertIs(first_envelope, second_envelope)
+        self.assertEqual(first_envelope.id, event.id)
+        self.assertEqual(first_envelope.as_dict()['id'], event.id)
+
+        # Every subscriber gets its own copy of the event data
+        first_envelope.as_dict()['action'] = 'delete'
+        self.assertEqual(second_envelope.as_dict()['action'], 'read')
+
+    def test_filter(self):
+        subscription = self.bus.subscribe(actions=['delete'], topics=['compute'], roles=[ObserverRole.RECEIVER])
+
+        self.publish('read', ObserverRole.RECEIVER)
+        self.publish('delete', ObserverRole.SENDER)
+        self.publish('delete', ObserverRole.RECEIVER, 'scheduler')
+        event = self.publish('delete', ObserverRole.RECEIVER)
+
+        self.assertEqual(subscription.get(0).id, event.id)
+        self.assertIsNone(subscription.get(0))
+
+    def test_drop_oldest(self):
+        subscription = self.bus.subscribe(maxsize=2)
+        events = [self.publish() for _ in range(3)]
+
+        self.assertEqual([subscription.get(0).id for _ in range(2)], [event.id for event in events[1:]])
+        self.assertEqual(subscription.dropped, 1)
+
+    def test_drop_newest(self):
+        subscription = self.bus.subscribe(maxsize=2, drop_policy=DropPolicy.DROP_NEWEST)
+        events = [self.publish() for _ in range(3)]
+
+        self.assertEqual([subscription.get(0).id for _ in range(2)], [event.id for event in events[:2]])
+        self.assertEqual(subscription.dropped, 1)
+
+    def test_callback(self):
+        received = []
+        delivered = threading.Event()
+
+        def callback(envelope):
+            received.append(envelope.id)
+            delivered.set()
+
+        subscription = self.bus.subscribe(callback)
+
+        event = self.publish()
+
+        self.assertTrue(delivered.wait(5))
+        self.assertEqual(received, [event.id])
+
+        self.bus.unsubscribe(subscription)
+        self.publish()
+
+        self.assertEqual(self.bus.subscriptions, ())
+
+    def test_tail(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'tail.sock')
+            server = serve_tail(self.bus, path)
+
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+                client.connect(path)
+                client.sendall(b'{"actions": ["delete"]}\n')
+
+                # Wait for the subscription of the client
+                while not self.bus.subscriptions:
+                    time.sleep(0.01)
+
+                self.publish('read')
+                event = self.publish('delete')
+
+                line = client.makefile('r').readline()
+
+            server.stop()
+
+        self.assertEqual(json.loads(line)['id'], event.id)
+
+    def test_tail_disconnect(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'tail.sock')
+            server = serve_tail(self.bus, path)
+
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+                client.connect(path)
+                client.sendall(b'{"actions": ["delete"]}\n')
+
+                while not self.bus.subscriptions:
+                    time.sleep(0.01)
+
+            # The subscription is removed without a matching event
+            for _ in range(300):
+                if not self.bus.subscriptions:
+                    break
+
+                time.sleep(0.01)
+
+            self.assertEqual(self.bus.subscriptions, ())
+
+            server.stop()
+
+    def test_tail_socket_in_use(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'tail.sock')
+            server = serve_tail(self.bus, path)
+
+            with self.assertRaises(OSError):
+                serve_tail(EventBus(), path)
+
+            self.assertEqual(self.bus.subscriptions, ())
+
+            # The socket of a stopped server is replaced
+            server.stop()
+            serve_tail(self.bus, path).stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
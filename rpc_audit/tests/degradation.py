@@ -0,0 +1,87 @@
+import unittest
+from unittest import TestCase
+
+from rpc_audit.base import ObserverRole, DEGRADED_TAG
+from rpc_audit.degradation import DegradationController
+from rpc_audit.modules.oslo_messaging import builder
+from rpc_audit.tests import oslo_messaging as oslo_test
+
+
+class TestDegradationController(TestCase):
+    def setUp(self) -> None:
+        self.controller = DegradationController(max_queue_depth=4, max_latency=0.1, hold_time=0)
+
+        super(TestDegradationController, self).setUp()
+
+    def test_queue_depth(self):
+        for i in range(3):
+            self.controller.enqueue()
+
+        self.assertFalse(self.controller.degraded)
+
+        self.controller.enqueue()
+        self.assertTrue(self.controller.degraded)
+
+        # Hysteresis: stays degraded until the queue depth is at the resume threshold
+        self.controller.dequeue()
+        self.assertTrue(self.controller.degraded)
+
+        self.controller.dequeue()
+        self.assertFalse(self.controller.degraded)
+        self.assertEqual(self.controller.activations, 1)
+
+    def test_latency(self):
+        self.controller.smoothing = 1.0
+
+        self.controller.add_latency(0.2)
+        self.assertTrue(self.controller.degraded)
+
+        self.controller.add_latency(0.07)
+        self.assertTrue(self.controller.degraded)
+
+        self.controller.add_latency(0.03)
+        self.assertFalse(self.controller.degraded)
+
+    def test_hold_time(self):
+        self.controller.hold_time = 3600
+
+        for i in range(4):
+            self.controller.enqueue()
+
+        for i in range(4):
+            self.controller.dequeue()
+
+        self.assertTrue(self.controller.degraded)
+
+
+class TestEssentialEvents(TestCase):
+    oslo_case = oslo_test.TestOsloMessaging
+
+    def build(self, essential_only):
+        events = builder.build_events(self.oslo_case.context, 'reboot_instance', self.oslo_case.params,
+                                      ObserverRole.SENDER, result={'state': 'rebooted'},
+                                      essential_only=essential_only)
+
+        self.assertEqual(len(events), 1)
+
+        return events[0].as_dict()
+
+    def test_complete_event(self):
+        event = self.build(False)
+
+        self.assertEqual([a['name'] for a in event['attachments']],
+                         ['project', 'permissions', 'request_id', 'rpc_method', 'request_hash', 'result'])
+        self.assertNotIn(DEGRADED_TAG, event['tags'])
+
+    def test_essential_event(self):
+        event = self.build(True)
+
+        self.assertEqual([a['name'] for a in event['attachments']],
+                         ['project', 'request_id', 'rpc_method', 'request_hash'])
+        self.assertEqual(event['action'], 'start')
+        self.assertEqual(event['target']['id'], self.oslo_case.params['instance']['uuid'])
+        self.assertIn(DEGRADED_TAG, event['tags'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,219 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import TestCase
+
+from rpc_audit import base
+from rpc_audit.base import CADFBuildingEnv, ObserverRole
+from rpc_audit.integrity import IntegrityLog, verify_log, prove, verify_proof
+from rpc_audit.model import Event
+
+
+class TestIntegrity(TestCase):
+    key = b'secret'
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'events.txt')
+
+        self.log = IntegrityLog(self.path, batch_size=8, key=self.key)
+
+        for i in range(21):
+            self.log.write(json.dumps({'id': i, 'action': 'read'}))
+
+        self.log.close()
+
+        super(TestIntegrity, self).setUp()
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+        super(TestIntegrity, self).tearDown()
+
+    def modify_line(self, index, line):
+        with open(self.path) as event_file:
+            lines = event_file.readlines()
+
+        lines[index] = line + '\n'
+
+        with open(self.path, 'w') as event_file:
+            event_file.writelines(lines)
+
+    def test_valid(self):
+        result = verify_log(self.path, key=self.key)
+
+        self.assertTrue(result.valid, result.errors)
+        self.assertEqual(result.events, 21)
+        self.assertEqual(result.seals, 3)
+        self.assertEqual(result.unsealed, 0)
+
+    def test_modified_event(self):
+        self.modify_line(10, json.dumps({'id': 10, 'action': 'delete'}))
+
+        result = verify_log(self.path, key=self.key)
+
+        self.assertFalse(result.valid)
+        self.assertEqual(len(result.errors), 2)
+        self.assertIn('seal 1', result.errors[0])
+
+    def test_wrong_key(self):
+        self.assertFalse(verify_log(self.path, key=b'wrong').valid)
+
+    def test_resume(self):
+        log = IntegrityLog(self.path, batch_size=8, key=self.key)
+        log.write(json.dumps({'id': 21}))
+        log.close()
+
+        result = verify_log(self.path, key=self.key)
+
+        self.assertTrue(result.valid, result.errors)
+        self.assertEqual(result.events, 22)
+
+    def test_partial_event(self):
+        with open(self.path, 'a') as event_file:
+            event_file.write('{"id":21, "trunc')
+
+        log = IntegrityLog(self.path, batch_size=8, key=self.key)
+        log.write(json.dumps({'id': 22}))
+        log.close()
+
+        result = verify_log(self.path, key=self.key)
+
+        self.assertTrue(result.valid, result.errors)
+        self.assertEqual(result.events, 23)
+
+        with open(self.path) as event_file:
+            self.assertEqual(json.loads(event_file.readlines()[-1]), {'id': 22})
+
+    def test_single_writer(self):
+        log = IntegrityLog(self.path, batch_size=8, key=self.key)
+
+        with self.assertRaises(OSError):
+            IntegrityLog(self.path, batch_size=8, key=self.key)
+
+        # Another seal file does not allow a second writer of the event file
+        with self.assertRaises(OSError):
+            IntegrityLog(self.path, seal_path=self.path + '.other', batch_size=8, key=self.key)
+
+        log.close()
+
+        self.write(21, 1)
+
+    def test_shared_log(self):
+        class Env(CADFBuildingEnv):
+            def build_events(self, context, method, args, role, result=None):
+                return [Event(action='read')]
+
+        event_file, use_api = base.EVENT_FILE, base.USE_API
+        base.EVENT_FILE, base.USE_API = self.path, False
+
+        try:
+            log = IntegrityLog(self.path, batch_size=8, key=self.key)
+            envs = [Env(), Env()]
+            envs[0].integrity = log
+
+            for env in envs:
+                env.build_and_save_events({}, 'get_console', {}, ObserverRole.SENDER)
+
+            log.close()
+        finally:
+            base.EVENT_FILE, base.USE_API = event_file, use_api
+
+        result = verify_log(self.path, key=self.key)
+
+        self.assertTrue(result.valid, result.errors)
+        self.assertEqual(result.events, 23)
+        self.assertEqual(base.INTEGRITY_LOGS, {})
+
+    def write(self, start, count):
+        log = IntegrityLog(self.path, batch_size=8, key=self.key)
+
+        for i in range(start, start + count):
+            log.write(json.dumps({'id': i}))
+
+        log.close()
+
+    def test_rotation_on_start(self):
+        os.rename(self.path, self.path + '.1')
+
+        self.write(21, 10)
+
+        result = verify_log(self.path, key=self.key)
+
+        self.assertTrue(result.valid, result.errors)
+        self.assertEqual(result.events, 10)
+        self.assertEqual(result.unchecked, 21)
+
+        result = verify_log([self.path + '.1', self.path], key=self.key)
+
+        self.assertTrue(result.valid, result.errors)
+        self.assertEqual(result.events, 31)
+        self.assertEqual(json.loads(prove(self.path, 3)['event']), {'id': 24})
+
+    def test_rotation_while_running(self):
+        log = IntegrityLog(self.path, batch_size=4, key=self.key)
+
+        for i in range(21, 27):
+            log.write(json.dumps({'id': i}))
+
+            if i == 22:
+                os.rename(self.path, self.path + '.1')
+
+        log.close()
+
+        with gzip.open(self.path + '.1.gz', 'wb') as compressed, open(self.path + '.1', 'rb') as rotated:
+            shutil.copyfileobj(rotated, compressed)
+
+        os.unlink(self.path + '.1')
+
+        result = verify_log([self.path + '.1.gz', self.path], key=self.key)
+
+        self.assertTrue(result.valid, result.errors)
+        self.assertEqual(result.events, 27)
+
+        # Events 21-24 have been written to the rotated file, before the seal of the batch detected the rotation
+        with open(self.path) as event_file:
+            self.assertEqual([json.loads(line)['id'] for line in event_file], [25, 26])
+
+    def test_truncated_segment(self):
+        self.write(21, 10)
+        os.rename(self.path, self.path + '.1')
+        self.write(31, 2)
+
+        # The rotated file is shorter than sealed
+        with open(self.path + '.1', 'r+') as event_file:
+            event_file.truncate(10)
+
+        result = verify_log([self.path + '.1', self.path], key=self.key)
+
+        self.assertFalse(result.valid)
+
+        # Only the seals of the truncated segment are broken
+        for error in result.errors:
+            self.assertIn('segment 0', error)
+
+    def test_unsealed(self):
+        with open(self.path, 'a') as event_file:
+            event_file.write('{}\n')
+
+        result = verify_log(self.path, key=self.key)
+
+        self.assertTrue(result.valid)
+        self.assertEqual(result.unsealed, 1)
+
+    def test_proof(self):
+        for index in range(21):
+            proof = prove(self.path, index)
+
+            self.assertEqual(json.loads(proof['event'])['id'], index)
+            self.assertTrue(verify_proof(proof, self.key))
+
+        proof['event'] = json.dumps({'id': 20, 'action': 'delete'})
+        self.assertFalse(verify_proof(proof, self.key))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+from unittest import TestCase
+
+from rpc_audit.base import ObserverRole
+from rpc_audit.model import Event, Resource, validate_events
+from rpc_audit.modules.oslo_messaging import builder
+from rpc_audit.tests import oslo_messaging as oslo_test
+
+
+class TestModel(TestCase):
+    oslo_case = oslo_test.TestOsloMessaging
+
+    def build(self, params, method='reboot_instance'):
+        return builder.build_events(self.oslo_case.context, method, params, ObserverRole.SENDER,
+                                    result={'state': 'rebooted'})
+
+    def test_same_as_pycadf(self):
+        event = self.build(self.oslo_case.params)[0]
+
+        self.assertEqual(event.as_dict(), event.to_cadf().as_dict())
+
+    def test_interned(self):
+        first, second = self.build(self.oslo_case.params)[0], self.build(self.oslo_case.params)[0]
+
+        self.assertIs(first.action, second.action)
+        self.assertIs(first.initiator.typeURI, second.initiator.typeURI)
+
+    def test_multiple_targets(self):
+        instances = [dict(self.oslo_case.params['instance'], uuid=uuid) for uuid in ('uuid-1', 'uuid-2', 'uuid-3')]
+
+        events = self.build({'instances': instances}, method='stop_instance')
+
+        self.assertEqual([event.target.id for event in events], ['uuid-1', 'uuid-2', 'uuid-3'])
+        self.assertEqual(len({event.id for event in events}), 3)
+
+        for event in events:
+            self.assertIn(events[0].id, event.tags)
+            self.assertEqual(len(event.attachments), 6)
+
+        # The events do not share their lists
+        events[1].tags.append('modified')
+        self.assertNotIn('modified', events[0].tags)
+        self.assertIsNot(events[1].attachments, events[0].attachments)
+
+    def test_validate(self):
+        valid = Event(action='read', outcome='success', initiator=Resource('user'), target=Resource('target-id'),
+                      observer=Resource('observer'))
+        invalid_action = Event(action='invalid', initiator=Resource('user'), target=Resource('target-id'),
+                               observer=Resource('observer'))
+        missing_target = Event(action='read', initiator=Resource('user'), observer=Resource('observer'))
+
+        self.assertEqual(validate_events([valid, invalid_action, missing_target]), [valid])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import json
+import os
+import stat
+import tempfile
+import unittest
+from unittest import TestCase
+
+from pycadf.utils import mask_value
+
+from rpc_audit import base
+from rpc_audit.base import ObserverRole
+from rpc_audit.modules.oslo_messaging import builder, router
+from rpc_audit.recorder import TraceRecorder, read_trace, restore_context
+from rpc_audit.replay import replay
+from rpc_audit.tests import oslo_messaging as oslo_test
+
+
+class TestReplay(TestCase):
+    # Use the same RPC call as the oslo.messaging test
+    oslo_case = oslo_test.TestOsloMessaging
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'trace.jsonl')
+
+        recorder = TraceRecorder(self.path)
+
+        for i in range(10):
+            recorder.record(self.oslo_case.context, 'reboot_instance', self.oslo_case.params, ObserverRole.SENDER)
+
+        recorder.close()
+
+        self.records = list(read_trace(self.path))
+
+        super(TestReplay, self).setUp()
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+        super(TestReplay, self).tearDown()
+
+    def test_record(self):
+        self.assertEqual(len(self.records), 10)
+
+        record = self.records[0]
+        context = restore_context(record)
+
+        self.assertEqual(record['method'], 'reboot_instance')
+        self.assertEqual(record['args'], self.oslo_case.params)
+        self.assertEqual(context['target'].topic, 'compute')
+        self.assertEqual(context['ctxt'].roles, ['role1', 'role2', 'role3'])
+
+    def test_record_masks_credentials(self):
+        with open(self.path) as trace_file:
+            record = json.loads(trace_file.readline())
+
+        token = self.oslo_case.ctxt.auth_token
+
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o600)
+        self.assertNotIn(token, json.dumps(record))
+        self.assertEqual(record['context']['ctxt']['auth_token'], mask_value(token))
+
+    def test_record_masks_arguments(self):
+        recorder = TraceRecorder(self.path)
+        recorder.record(self.oslo_case.context, 'set_admin_password', {
+            'instance': self.oslo_case.params['instance'],
+            'new_pass': 'very-secret-password',
+            'options': {'admin_password': 'another-password', 'RESCUE_PASSWORD': 'third-password'},
+        }, ObserverRole.SENDER)
+        recorder.close()
+
+        record = list(read_trace(self.path))[-1]
+
+        self.assertEqual(record['args']['new_pass'], mask_value('very-secret-password'))
+        self.assertEqual(record['args']['options']['admin_password'], mask_value('another-password'))
+        self.assertEqual(record['args']['options']['RESCUE_PASSWORD'], mask_value('third-password'))
+        self.assertEqual(record['args']['instance'], self.oslo_case.params['instance'])
+
+    def test_replay(self):
+        report = replay(builder, self.records, threads=3, build_only=True)
+
+        self.assertEqual(report.calls, 10)
+        self.assertEqual(report.errors, 0)
+        self.assertEqual(len(report.latencies), 10)
+
+    def test_replay_async(self):
+        output = os.path.join(self.directory.name, 'events.txt')
+        event_file = base.EVENT_FILE
+        base.EVENT_FILE = output
+
+        try:
+            report = replay(router, self.records, threads=2, asynchronous=True)
+        finally:
+            base.EVENT_FILE = event_file
+
+        self.assertEqual(report.calls, 10)
+        self.assertEqual(len(report.latencies), 10)
+        self.assertNotIn('build_and_save_events', vars(builder))
+
+        with open(output) as events:
+            self.assertEqual(len(events.readlines()), 10)
+
+    def test_replay_router(self):
+        self.records[0]['context']['target']['topic'] = 'network'
+
+        report = replay(router, self.records, build_only=True)
+
+        self.assertEqual(report.calls, 9)
+        self.assertEqual(report.skipped, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+from unittest import TestCase
+
+from rpc_audit.base import CADFBuildingEnv
+from rpc_audit.router import CADFRouter
+
+
+class Struct:
+    def __init__(self, entries: dict):
+        self.__dict__.update(entries)
+
+
+class TestRouter(TestCase):
+    def setUp(self) -> None:
+        self.compute_env = CADFBuildingEnv()
+        self.scheduler_env = CADFBuildingEnv()
+        self.select_env = CADFBuildingEnv()
+
+        self.router = CADFRouter()
+        self.router.register(self.compute_env, 'compute')
+        self.router.register(self.scheduler_env, 'scheduler')
+        self.router.register(self.select_env, 'scheduler', method='select_destinations')
+
+        super(TestRouter, self).setUp()
+
+    @staticmethod
+    def context(topic):
+        return {'target': Struct({'topic': topic})}
+
+    def test_separate_builder_maps(self):
+        self.compute_env.builder_map.clear()
+
+        self.assertEqual(self.compute_env.builder_map, {})
+        self.assertNotEqual(self.scheduler_env.builder_map, {})
+
+    def test_route_topic(self):
+        self.assertIs(self.router.route(self.context('compute'), 'reboot_instance'), self.compute_env)
+        self.assertIs(self.router.route(self.context('scheduler'), 'update_aggregates'), self.scheduler_env)
+
+    def test_route_method(self):
+        self.assertIs(self.router.route(self.context('scheduler'), 'select_destinations'), self.select_env)
+
+    def test_route_unknown_topic(self):
+        self.assertIsNone(self.router.route(self.context('conductor'), 'build_instances'))
+        self.assertIsNone(self.router.route({}, 'build_instances'))
+
+    def test_route_default(self):
+        self.router.default = self.compute_env
+
+        self.assertIs(self.router.route(self.context('conductor'), 'build_instances'), self.compute_env)
+
+    def test_route_changing_topics(self):
+        topics = {'network'}
+        self.router.register_topics(self.compute_env, lambda: topics)
+
+        self.assertIs(self.router.route(self.context('network'), 'allocate_for_instance'), self.compute_env)
+        self.assertIsNone(self.router.route(self.context('volume'), 'create_volume'))
+
+        topics.add('volume')
+
+        self.assertIs(self.router.route(self.context('volume'), 'create_volume'), self.compute_env)
+
+    def test_unknown_topic_is_dropped(self):
+        def fail(*args, **kwargs):
+            raise AssertionError("Call should have been dropped")
+
+        self.compute_env.process_async = fail
+
+        self.router.rpc_called(self.context('network'), 'reboot_instance', {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+import gzip
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest import TestCase, mock
+
+from rpc_audit import scanner
+from rpc_audit.scanner import Query, scan, rotation_order
+
+
+def make_event(i):
+    return {
+        'id': 'event-{}'.format(i),
+        'eventTime': '2020-11-22T15:{:02d}:00.000000+0000'.format(i % 60),
+        'action': 'delete' if i % 10 == 0 else 'read',
+        'outcome': 'success',
+        'initiator': {'id': 'user-{}'.format(i % 3)},
+        'target': {'id': 'instance-{}'.format(i % 7)},
+        'attachments': [{'name': 'request_id', 'typeURI': 'python/str', 'content': 'req-{}'.format(i)}],
+    }
+
+
+class TestScanner(TestCase):
+    events = [make_event(i) for i in range(300)]
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+
+        # Rotated segments: events.txt.2.gz (oldest), events.txt.1, events.txt (newest)
+        segments = [('events.txt.2.gz', self.events[:100]), ('events.txt.1', self.events[100:200]),
+                    ('events.txt', self.events[200:])]
+
+        self.paths = []
+
+        for name, events in segments:
+            path = os.path.join(self.directory.name, name)
+            data = ''.join(json.dumps(event) + '\n' for event in events).encode('utf-8')
+
+            with (gzip.open if name.endswith('.gz') else open)(path, 'wb') as log_file:
+                log_file.write(data)
+
+            self.paths.append(path)
+
+        super(TestScanner, self).setUp()
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+        super(TestScanner, self).tearDown()
+
+    def scan(self, query):
+        # Small chunks, to test the splitting on line boundaries
+        paths = rotation_order(reversed(self.paths))
+        return [json.loads(line) for line in scan(paths, query, workers=2, chunk_size=1000)]
+
+    def expected(self, query):
+        return [event for event in self.events if query.matches(event)]
+
+    def test_rotation_order(self):
+        self.assertEqual(rotation_order(reversed(self.paths)), self.paths)
+
+    def test_rotation_order_skips_seals(self):
+        paths = self.paths + [self.paths[-1] + '.seals']
+
+        self.assertEqual(rotation_order(reversed(paths)), self.paths)
+
+    def test_all(self):
+        self.assertEqual(self.scan(Query()), self.events)
+
+    def test_predicates(self):
+        queries = [
+            Query(initiator_id='user-1'),
+            Query(initiator_id='user-1', target_id='instance-3', action='read'),
+            Query(action='delete', outcome='success'),
+            Query(request_id='req-150'),
+            Query(since=datetime(2020, 11, 22, 15, 10, tzinfo=timezone.utc),
+                  until=datetime(2020, 11, 22, 15, 20, tzinfo=timezone.utc)),
+        ]
+
+        for query in queries:
+            result = self.scan(query)
+
+            self.assertTrue(result)
+            self.assertEqual(result, self.expected(query))
+
+    def test_prefilter_is_not_sufficient(self):
+        # "user-1" is also contained in the target id of the second event, but only initiator ids may match
+        events = [make_event(1), make_event(2)]
+        events[1]['target']['id'] = 'user-1'
+
+        path = os.path.join(self.directory.name, 'prefilter.txt')
+
+        with open(path, 'w') as log_file:
+            log_file.writelines(json.dumps(event) + '\n' for event in events)
+
+        self.assertEqual([json.loads(line) for line in scan([path], Query(initiator_id='user-1'), workers=1)],
+                         events[:1])
+
+    def test_no_events(self):
+        path = os.path.join(self.directory.name, 'other.txt')
+
+        with open(path, 'w') as log_file:
+            log_file.write('{"initiator": "u"}\n[1, 2]\n"text"\n{"eventTime": 5}\n')
+            log_file.write(json.dumps(make_event(1)) + '\n')
+
+        queries = [
+            # Only JSON objects are returned, but they are not checked further without predicates
+            (Query(), [{'initiator': 'u'}, {'eventTime': 5}, make_event(1)]),
+            (Query(initiator_id='u'), []),
+            (Query(initiator_id='user-1', since=datetime(2020, 11, 22, tzinfo=timezone.utc)), [make_event(1)]),
+        ]
+
+        for query, expected in queries:
+            self.assertEqual([json.loads(line) for line in scan([path], query, workers=1)], expected)
+
+    def test_time_prefilter(self):
+        query = Query(since=datetime(2020, 11, 22, 15, 10), until=datetime(2020, 11, 22, 16, 20, tzinfo=timezone(
+            timedelta(hours=1))))
+
+        with open(self.paths[2], 'rb') as log_file:
+            data = log_file.read()
+
+        with mock.patch.object(scanner, 'match_line', wraps=scanner.match_line) as match_line:
+            result = [json.loads(line) for line in scanner.scan_buffer(data, 0, len(data), query)]
+
+        # Only the lines inside of the time range are parsed
+        self.assertEqual(result, [event for event in self.events[200:] if query.matches(event)])
+        self.assertEqual(match_line.call_count, len(result))
+        self.assertEqual(len(result), 10)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -13,6 +13,12 @@ setuptools.setup(
     long_description_content_type="text/markdown",
     url="https://publicgitlab.cloudandheat.com/cloud-kritis/rpc-audit",
     packages=setuptools.find_packages(),
+    package_data={
+        'rpc_audit': ['modules/*.json'],
+    },
+    entry_points={
+        'console_scripts': ['rpc_audit=rpc_audit.cli:main'],
+    },
     classifiers=[
         "Programming Language :: Python :: 3",
         "Operating System :: OS Independent",